@@ -0,0 +1,85 @@
+"""
+In-memory audio decoding and preprocessing
+Turns uploaded WAV bytes into mono, 16 kHz, peak-normalized float32 arrays without touching disk
+"""
+
+import io
+from functools import lru_cache
+from math import gcd
+import numpy as np
+import soundfile as sf
+from scipy.signal import firwin, resample_poly
+from metrics import STAGE_SECONDS
+
+TARGET_SAMPLE_RATE = 16000
+
+def decode_wav(source):
+    """Decode WAV bytes, a path or a seekable file object into a mono float32 array and its sample rate"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+
+    try:
+        audio, sr = sf.read(source, dtype="float32", always_2d=False)
+    except Exception as e:
+        raise ValueError(f"Could not decode WAV audio: {e}")
+
+    return to_mono(audio), sr
+
+def encode_wav(audio, sr):
+    """Encode a float32 array as an in-memory WAV file object"""
+    buffer = io.BytesIO()
+    sf.write(buffer, audio, sr, format="WAV", subtype="FLOAT")
+    buffer.seek(0)
+    return buffer
+
+def to_mono(audio):
+    """Average (frames, channels) down to (frames,) without leaving float32"""
+    if audio.ndim == 1:
+        return audio
+    if audio.shape[1] == 1:
+        return audio[:, 0]
+    return audio.mean(axis=1, dtype=np.float32)
+
+@lru_cache(maxsize=32)
+def _polyphase_filter(up, down):
+    """Low-pass FIR taps for an up/down ratio, designed once and reused"""
+    max_rate = max(up, down)
+    taps = firwin(2 * 10 * max_rate + 1, 1.0 / max_rate, window=("kaiser", 5.0))
+    taps = taps.astype(np.float32)
+    taps.setflags(write=False)
+    return taps
+
+def resample(audio, sr, target_sr=TARGET_SAMPLE_RATE):
+    """Polyphase resample to target_sr; returns the input unchanged if already at that rate"""
+    if sr == target_sr:
+        return audio
+    factor = gcd(int(sr), int(target_sr))
+    up, down = target_sr // factor, sr // factor
+    return resample_poly(audio, up, down, window=_polyphase_filter(up, down))
+
+def normalize(audio):
+    """Scale to unit peak amplitude in place"""
+    peak = np.abs(audio).max() if audio.size else 0.0
+    if peak > 0:
+        audio *= np.float32(1.0 / peak)
+    return audio
+
+def preprocess(audio, sr, target_sr=TARGET_SAMPLE_RATE):
+    """Mono -> resample -> normalize, staying in float32 and reusing the buffer where possible"""
+    audio = to_mono(np.asarray(audio, dtype=np.float32))
+
+    with STAGE_SECONDS.time(modality="audio", stage="resample"):
+        resampled = resample(audio, sr, target_sr)
+
+    # Normalization is in place; only read-only buffers (e.g. np.frombuffer) need a copy
+    if not resampled.flags.writeable:
+        resampled = resampled.copy()
+
+    with STAGE_SECONDS.time(modality="audio", stage="normalize"):
+        return normalize(resampled), target_sr
+
+def load_audio(source, target_sr=TARGET_SAMPLE_RATE):
+    """Decode and preprocess in one pass: ready-to-infer float32 audio at target_sr"""
+    with STAGE_SECONDS.time(modality="audio", stage="decode"):
+        audio, sr = decode_wav(source)
+    return preprocess(audio, sr, target_sr)
@@ -0,0 +1,104 @@
+"""
+Request coalescing for model inference
+Concurrent single-item calls are gathered for a short window and run as one batch
+"""
+
+import asyncio
+from executor import QueueFullError
+
+class MicroBatcher:
+    """Collects submitted items and runs them through batch_fn in groups"""
+
+    def __init__(self, batch_fn, max_batch_size=16, max_wait_ms=5.0, executor=None, max_pending=None):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.executor = executor
+        self.max_pending = max_pending
+        self._queue = None
+        self._worker = None
+        self._loop = None
+
+    @property
+    def pending(self):
+        """Number of items waiting to be batched"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, item):
+        """Queue a single item and wait for its own result"""
+        loop = asyncio.get_running_loop()
+        # The queue and worker belong to one loop; a new loop (e.g. an app restart) gets its own
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = None
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+        if self.max_pending is not None and self.pending >= self.max_pending:
+            raise QueueFullError("Batch queue is full")
+
+        future = loop.create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self):
+        """Wait for the first item, then gather more until the batch is full or the window closes"""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued without waiting
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        # One batch in flight per executor worker; while all are busy, new items keep
+        # queueing and are collected into the next batch once a worker frees up
+        slots = asyncio.Semaphore(self.executor.max_workers if self.executor is not None else 1)
+        inflight = set()
+        while True:
+            await slots.acquire()
+            batch = await self._collect()
+
+            # Drop callers that went away while waiting
+            batch = [(item, future) for item, future in batch if not future.done()]
+            if not batch:
+                slots.release()
+                continue
+
+            task = asyncio.get_running_loop().create_task(self._dispatch(batch, slots))
+            # Keep a reference so the task isn't garbage collected mid-run
+            inflight.add(task)
+            task.add_done_callback(inflight.discard)
+
+    async def _dispatch(self, batch, slots):
+        """Run one batch and resolve its callers' futures"""
+        items = [item for item, _ in batch]
+        try:
+            if self.executor is not None:
+                results = await self.executor.run(self.batch_fn, items)
+            else:
+                results = await asyncio.get_running_loop().run_in_executor(None, self.batch_fn, items)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            slots.release()
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,330 @@
+"""
+Offline bulk scoring
+Streams CSV/JSONL records or a directory of WAV files through the models in batches and writes
+results incrementally to JSONL or Parquet, with a checkpoint so an interrupted job resumes
+where it stopped instead of starting over
+
+    python bulk_score.py reviews.csv scores.jsonl --text-column body --id-column review_id
+    python bulk_score.py calls/ scores.parquet --batch-size 8
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from itertools import islice
+
+from emotion_mapping import TARGET_EMOTIONS
+from audio_io import decode_wav
+from vad import VAD_AGGRESSIVENESS
+from inference import predict_text_batch, predict_speech_batch
+
+# Parquet output is a directory of part files, each holding this many rows
+PARQUET_ROWS_PER_FILE = 100_000
+# Seconds between progress lines
+PROGRESS_INTERVAL = 10.0
+
+# --- Input ---
+
+# Stands in for the text of a record that couldn't be read, so it gets an error row
+# instead of stopping the job (a resumed run would stop on it again). Its row has a null id
+# when ids come from --id-column, so a line number can't collide with a real id, and carries
+# the 1-based file line instead
+BadRecord = namedtuple("BadRecord", "error line")
+
+def iter_csv(path, text_column, id_column=None):
+    """Yield (id, text) per CSV row; ids default to the row number"""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for column in (text_column, id_column):
+            if column and column not in (reader.fieldnames or []):
+                raise SystemExit(f"Column '{column}' not found in {path}")
+        for number, row in enumerate(reader):
+            if id_column and row[id_column] is None:
+                # Short row: the id column is missing from this line
+                yield None, BadRecord(f"Missing id column '{id_column}'", reader.line_num)
+                continue
+            yield (row[id_column] if id_column else number), row[text_column]
+
+def iter_jsonl(path, text_column, id_column=None):
+    """Yield (id, text) per JSON line; ids default to the line number"""
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f):
+            if not line.strip():
+                continue
+            bad_id = None if id_column else number
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield bad_id, BadRecord(f"Invalid JSON: {e}", number + 1)
+                continue
+            if not isinstance(record, dict):
+                yield bad_id, BadRecord("Record is not a JSON object", number + 1)
+                continue
+            if id_column and id_column not in record:
+                yield None, BadRecord(f"Missing id field '{id_column}'", number + 1)
+                continue
+            yield (record[id_column] if id_column else number), record.get(text_column)
+
+def iter_wav_dir(path):
+    """Yield (relative path, path) for every .wav file below path, in a stable order"""
+    for root, dirs, files in os.walk(path):
+        # Sorted so a resumed run sees the same order
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(".wav"):
+                full_path = os.path.join(root, name)
+                yield os.path.relpath(full_path, path), full_path
+
+def open_records(args):
+    """(modality, record iterator) for the input path"""
+    if os.path.isdir(args.input):
+        return "audio", iter_wav_dir(args.input)
+    if args.input.endswith(".csv"):
+        return "text", iter_csv(args.input, args.text_column, args.id_column)
+    if args.input.endswith((".jsonl", ".ndjson")):
+        return "text", iter_jsonl(args.input, args.text_column, args.id_column)
+    raise SystemExit("Input must be a .csv or .jsonl file, or a directory of .wav files")
+
+def batched(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# --- Scoring ---
+
+def _row(record_id, result):
+    """Uniform output row for text and speech results"""
+    if "error" in result:
+        return {"id": record_id, "error": result["error"]}
+    row = {
+        "id": record_id,
+        "label": result.get("label", result.get("emotion")),
+        "score": result.get("score", result.get("confidence")),
+        "all_scores": result["all_scores"],
+    }
+    for key in ("trimmed_ratio", "sentences"):
+        if key in result:
+            row[key] = result[key]
+    return row
+
+def score_text(batch):
+    rows = [None] * len(batch)
+    valid = []
+    for i, (record_id, text) in enumerate(batch):
+        if isinstance(text, BadRecord):
+            rows[i] = {"id": record_id, "line": text.line, "error": text.error}
+        elif not isinstance(text, str) or not text.strip():
+            rows[i] = {"id": record_id, "error": "Text cannot be empty"}
+        else:
+            valid.append((i, record_id, text.strip()))
+
+    results = predict_text_batch([text for _, _, text in valid])
+    for (i, record_id, _), result in zip(valid, results):
+        rows[i] = _row(record_id, result)
+    return rows
+
+def score_audio(batch, vad_aggressiveness):
+    rows = [None] * len(batch)
+    # Clips in one model batch must share a sample rate
+    by_rate = {}
+    for i, (record_id, path) in enumerate(batch):
+        try:
+            audio, sr = decode_wav(path)
+            if audio.size == 0:
+                raise ValueError("Audio contains no samples")
+        except Exception as e:
+            rows[i] = {"id": record_id, "error": str(e)}
+            continue
+        by_rate.setdefault(sr, []).append((i, record_id, audio))
+
+    for sr, clips in by_rate.items():
+        results = predict_speech_batch([audio for _, _, audio in clips], sr, vad_aggressiveness)
+        for (i, record_id, _), result in zip(clips, results):
+            rows[i] = _row(record_id, result)
+    return rows
+
+# --- Output ---
+
+class JsonlWriter:
+    """Appends one JSON line per row; the byte offset marks what a checkpoint covers"""
+
+    pending = 0
+
+    def __init__(self, path, state):
+        self.file = open(path, "a+b")
+        # Drop anything written after the last checkpoint
+        self.offset = state.get("offset", 0)
+        self.file.truncate(self.offset)
+        self.file.seek(self.offset)
+
+    def write(self, rows):
+        self.file.write(b"".join(json.dumps(row, ensure_ascii=False).encode("utf-8") + b"\n" for row in rows))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.offset = self.file.tell()
+
+    def state(self):
+        return {"offset": self.offset}
+
+    def close(self):
+        self.file.close()
+
+class ParquetWriter:
+    """Buffers rows and writes them as numbered part files in a directory"""
+
+    def __init__(self, path, state, rows_per_file=PARQUET_ROWS_PER_FILE):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow: pip install pyarrow")
+
+        self.pa, self.pq = pa, pq
+        self.path = path
+        self.rows_per_file = rows_per_file
+        self.parts = state.get("parts", 0)
+        self.rows = []
+        self.schema = pa.schema(
+            [("id", pa.string()), ("line", pa.int64()), ("label", pa.string()), ("score", pa.float64()),
+             ("trimmed_ratio", pa.float64()), ("error", pa.string())]
+            + [(emotion, pa.float64()) for emotion in TARGET_EMOTIONS]
+        )
+
+        os.makedirs(path, exist_ok=True)
+        # Parts past the checkpoint belong to an interrupted run
+        for name in os.listdir(path):
+            if name.startswith("part-") and int(name[5:10]) >= self.parts:
+                os.remove(os.path.join(path, name))
+
+    @property
+    def pending(self):
+        return len(self.rows)
+
+    def write(self, rows):
+        for row in rows:
+            scores = row.get("all_scores", {})
+            self.rows.append({
+                "id": None if row["id"] is None else str(row["id"]),
+                "line": row.get("line"),
+                "label": row.get("label"),
+                "score": row.get("score"),
+                "trimmed_ratio": row.get("trimmed_ratio"),
+                "error": row.get("error"),
+                **{emotion: scores.get(emotion) for emotion in TARGET_EMOTIONS},
+            })
+        if len(self.rows) >= self.rows_per_file:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        table = self.pa.Table.from_pylist(self.rows, schema=self.schema)
+        part_path = os.path.join(self.path, f"part-{self.parts:05d}.parquet")
+        # Write then rename so a crash never leaves a truncated part
+        self.pq.write_table(table, f"{part_path}.tmp")
+        os.replace(f"{part_path}.tmp", part_path)
+        self.parts += 1
+        self.rows = []
+
+    def state(self):
+        return {"parts": self.parts}
+
+    def close(self):
+        self.flush()
+
+# --- Checkpoint ---
+
+def load_checkpoint(path, input_path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("input") != os.path.abspath(input_path):
+        raise SystemExit(f"{path} belongs to {checkpoint.get('input')}; pass --restart to start over")
+    return checkpoint
+
+def save_checkpoint(path, checkpoint):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+def run(args):
+    modality, records = open_records(args)
+    checkpoint_path = args.checkpoint or f"{args.output}.checkpoint.json"
+    if args.restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    checkpoint = load_checkpoint(checkpoint_path, args.input)
+    if checkpoint.get("complete"):
+        print(f"✓ {args.output} is already complete ({checkpoint['records']} records)")
+        return
+
+    done = checkpoint.get("records", 0)
+    if done:
+        print(f"Resuming after {done} records")
+
+    parquet = args.format == "parquet" or (args.format is None and args.output.endswith(".parquet"))
+    writer = ParquetWriter(args.output, checkpoint) if parquet else JsonlWriter(args.output, checkpoint)
+
+    def commit(complete=False):
+        save_checkpoint(checkpoint_path, {
+            "input": os.path.abspath(args.input), "records": done, "complete": complete, **writer.state(),
+        })
+
+    start = last_report = time.perf_counter()
+    scored = 0
+    try:
+        for batch in batched(islice(records, done, None), args.batch_size):
+            if modality == "text":
+                rows = score_text(batch)
+            else:
+                rows = score_audio(batch, args.vad_aggressiveness)
+            writer.write(rows)
+            done += len(batch)
+            scored += len(batch)
+
+            # Only checkpoint once everything scored so far is on disk
+            if writer.pending == 0:
+                commit()
+
+            now = time.perf_counter()
+            if now - last_report >= PROGRESS_INTERVAL:
+                print(f"Scored {done} records ({scored / (now - start):.1f}/s)")
+                last_report = now
+
+        writer.close()
+        commit(complete=True)
+    except KeyboardInterrupt:
+        print("\nInterrupted; rerun the same command to resume")
+        sys.exit(130)
+
+    elapsed = time.perf_counter() - start
+    print(f"✓ Scored {scored} records in {elapsed:.1f}s -> {args.output}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a text corpus or a directory of WAV files offline")
+    parser.add_argument("input", help=".csv or .jsonl file (text) or directory of .wav files (speech)")
+    parser.add_argument("output", help=".jsonl file or .parquet directory")
+    parser.add_argument("--text-column", default="text", help="Field holding the text")
+    parser.add_argument("--id-column", help="Field holding a record id (default: row number)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--format", choices=["jsonl", "parquet"], help="Default: from the output extension")
+    parser.add_argument("--vad-aggressiveness", type=int, default=VAD_AGGRESSIVENESS, choices=range(4))
+    parser.add_argument("--checkpoint", help="Checkpoint path (default: <output>.checkpoint.json)")
+    parser.add_argument("--restart", action="store_true", help="Ignore any checkpoint and start over")
+    args = parser.parse_args()
+
+    run(args)
+
+if __name__ == "__main__":
+    main()
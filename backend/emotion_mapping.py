@@ -0,0 +1,147 @@
+"""
+Emotion label mapping
+Maps raw model labels onto the 10 target emotions shared by both models with precomputed
+projection matrices, so a whole batch is mapped and calibrated in a few array operations
+"""
+
+import os
+from functools import lru_cache
+
+import numpy as np
+
+TARGET_EMOTIONS = [
+    "Happiness", "Sadness", "Anger", "Fear", "Surprise",
+    "Disgust", "Neutral", "Love/Affection", "Confusion", "Stress/Anxiety"
+]
+TARGET_INDEX = {emotion: i for i, emotion in enumerate(TARGET_EMOTIONS)}
+NEUTRAL = TARGET_INDEX["Neutral"]
+
+# go_emotions (28 labels) -> target emotion
+GO_EMOTIONS_MAP = {
+    "admiration": "Happiness", "amusement": "Happiness", "approval": "Happiness",
+    "excitement": "Happiness", "gratitude": "Happiness", "joy": "Happiness",
+    "optimism": "Happiness", "pride": "Happiness", "relief": "Happiness",
+    "disappointment": "Sadness", "embarrassment": "Sadness", "grief": "Sadness",
+    "remorse": "Sadness", "sadness": "Sadness",
+    "anger": "Anger", "annoyance": "Anger", "disapproval": "Anger",
+    "fear": "Fear",
+    "surprise": "Surprise", "realization": "Surprise",
+    "disgust": "Disgust",
+    "neutral": "Neutral",
+    "love": "Love/Affection", "caring": "Love/Affection", "desire": "Love/Affection",
+    "confusion": "Confusion", "curiosity": "Confusion",
+    "nervousness": "Stress/Anxiety",
+}
+GO_EMOTIONS_LABELS = tuple(GO_EMOTIONS_MAP)
+GO_EMOTIONS_INDEX = {label: i for i, label in enumerate(GO_EMOTIONS_LABELS)}
+
+# wav2vec2 speech emotion (8 labels) -> target emotion
+SPEECH_EMOTIONS_MAP = {
+    "angry": "Anger", "calm": "Neutral", "disgust": "Disgust", "fearful": "Fear",
+    "happy": "Happiness", "neutral": "Neutral", "sad": "Sadness", "surprised": "Surprise",
+}
+SPEECH_LABELS = tuple(SPEECH_EMOTIONS_MAP)
+
+# Neutral dominates both models' outputs; below NEUTRAL_KEEP_ABOVE its probability is scaled
+# by the per-modality factor and the distribution renormalized (1.0 disables)
+TEXT_NEUTRAL_SCALE = float(os.getenv("TEXT_NEUTRAL_SCALE", "1.0"))
+SPEECH_NEUTRAL_SCALE = float(os.getenv("SPEECH_NEUTRAL_SCALE", "0.3"))
+NEUTRAL_KEEP_ABOVE = float(os.getenv("NEUTRAL_KEEP_ABOVE", "0.95"))
+
+@lru_cache(maxsize=32)
+def projection_matrix(labels):
+    """(len(labels), 10) 0/1 matrix summing raw label scores into target emotions
+
+    Accepts go_emotions labels, speech labels or target emotions themselves;
+    unknown labels get an all-zero row.
+    """
+    matrix = np.zeros((len(labels), len(TARGET_EMOTIONS)), dtype=np.float32)
+    for i, label in enumerate(labels):
+        target = GO_EMOTIONS_MAP.get(label) or SPEECH_EMOTIONS_MAP.get(label) or label
+        if target in TARGET_INDEX:
+            matrix[i, TARGET_INDEX[target]] = 1.0
+    return matrix
+
+TEXT_PROJECTION = projection_matrix(GO_EMOTIONS_LABELS)
+SPEECH_PROJECTION = projection_matrix(SPEECH_LABELS)
+
+def _normalize(probs):
+    totals = probs.sum(axis=1, keepdims=True)
+    totals[totals == 0] = 1.0
+    return probs / totals
+
+def project(scores, projection, neutral_scale=1.0):
+    """Map an (n, labels) score array onto normalized, calibrated (n, 10) target probabilities"""
+    probs = _normalize(np.asarray(scores, dtype=np.float32) @ projection)
+    if neutral_scale != 1.0:
+        suppress = probs[:, NEUTRAL] < NEUTRAL_KEEP_ABOVE
+        probs[suppress, NEUTRAL] *= neutral_scale
+        probs = _normalize(probs)
+    return probs
+
+def to_results(probs, label_key="label", score_key="score"):
+    """One {label, score, all_scores} dict per row of target probabilities"""
+    top = probs.argmax(axis=1)
+    return [
+        {
+            label_key: TARGET_EMOTIONS[index],
+            score_key: float(row[index]),
+            "all_scores": dict(zip(TARGET_EMOTIONS, row.tolist())),
+        }
+        for row, index in zip(probs, top)
+    ]
+
+def text_score_matrix(outputs):
+    """(n, 28) go_emotions scores from text-classification pipeline outputs (top_k=None)"""
+    scores = np.zeros((len(outputs), len(GO_EMOTIONS_LABELS)), dtype=np.float32)
+    for row, items in zip(scores, outputs):
+        for item in items:
+            index = GO_EMOTIONS_INDEX.get(item["label"])
+            if index is not None:
+                row[index] = item["score"]
+    return scores
+
+def map_text_outputs(outputs, neutral_scale=TEXT_NEUTRAL_SCALE):
+    """Map a batch of pipeline outputs to target-emotion results"""
+    return to_results(project(text_score_matrix(outputs), TEXT_PROJECTION, neutral_scale))
+
+def map_text_probs(probs, labels, neutral_scale=TEXT_NEUTRAL_SCALE):
+    """Map an (n, labels) array of classifier probabilities, columns named by labels"""
+    return to_results(project(probs, projection_matrix(tuple(labels)), neutral_scale))
+
+def map_text_scores(raw_scores, neutral_scale=TEXT_NEUTRAL_SCALE):
+    """Collapse one text's go_emotions label scores into a normalized target distribution"""
+    return map_text_outputs([[{"label": k, "score": v} for k, v in raw_scores.items()]], neutral_scale)[0]
+
+def map_speech_results(results, neutral_scale=SPEECH_NEUTRAL_SCALE):
+    """Recompute emotion/confidence/all_scores of speech model results after calibration
+
+    Results carrying an error are passed through unchanged.
+    """
+    valid = [result for result in results if "error" not in result and result.get("all_scores")]
+    if not valid:
+        return results
+
+    labels = tuple(dict.fromkeys(label for result in valid for label in result["all_scores"]))
+    scores = np.array([[result["all_scores"].get(label, 0.0) for label in labels] for result in valid])
+    mapped = iter(to_results(project(scores, projection_matrix(labels), neutral_scale), "emotion", "confidence"))
+    return [
+        {**result, **next(mapped)} if "error" not in result and result.get("all_scores") else result
+        for result in results
+    ]
+
+def fuse_scores(distributions, weights):
+    """Weighted average of target-emotion distributions (e.g. text and speech all_scores)"""
+    totals = {emotion: 0.0 for emotion in TARGET_EMOTIONS}
+    for scores, weight in zip(distributions, weights):
+        # Normalize each input first so the weights alone decide its share
+        values = [float(scores.get(emotion, 0.0)) for emotion in TARGET_EMOTIONS]
+        norm = sum(values) or 1.0
+        for emotion, value in zip(TARGET_EMOTIONS, values):
+            totals[emotion] += weight * value / norm
+
+    total = sum(totals.values()) or 1.0
+    all_scores = {emotion: value / total for emotion, value in totals.items()}
+    label = max(all_scores, key=all_scores.get)
+
+    return {"label": label, "score": all_scores[label], "all_scores": all_scores}
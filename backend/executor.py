@@ -0,0 +1,62 @@
+"""
+Bounded thread-pool executors for model inference
+Keeps blocking model calls off the asyncio event loop and sheds load when full
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+async def run_to_completion(pool, fn, *args, **kwargs):
+    """Run fn on a thread pool and await it
+
+    If the caller is cancelled, a job still queued is dropped, and one already running (which
+    can't be interrupted) is waited for, so the caller can safely release what it was using.
+    """
+    job = pool.submit(functools.partial(fn, *args, **kwargs))
+    try:
+        return await asyncio.wrap_future(job)
+    except asyncio.CancelledError:
+        if not job.cancel():
+            await asyncio.wait([asyncio.wrap_future(job)])
+        raise
+
+class QueueFullError(Exception):
+    """Raised when an executor already has its maximum number of jobs queued"""
+
+class InferenceExecutor:
+    """Thread pool with a fixed worker count and a cap on waiting jobs"""
+
+    def __init__(self, name, max_workers=1, max_queue=16):
+        self.name = name
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix=f"{name}-inference"
+        )
+        # Only touched from the event loop thread, so no lock is needed
+        self._inflight = 0
+
+    @property
+    def depth(self):
+        """Jobs running or waiting for a worker"""
+        return self._inflight
+
+    @property
+    def full(self):
+        return self._inflight >= self.max_workers + self.max_queue
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn in the pool, or raise QueueFullError straight away if saturated"""
+        if self.full:
+            raise QueueFullError(f"{self.name} inference queue is full")
+
+        self._inflight += 1
+        try:
+            # The slot stays taken until the job has really stopped, even for cancelled callers
+            return await run_to_completion(self._pool, fn, *args, **kwargs)
+        finally:
+            self._inflight -= 1
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,157 @@
+"""
+Speech feature cache
+Preprocessed 16 kHz model input, keyed by a fingerprint of the decoded PCM samples, in a memory
+tier and an optional on-disk tier, each evicting least recently used entries past a byte budget
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# Memory tier budget (0 disables)
+SPEECH_FEATURE_CACHE_MB = float(os.getenv("SPEECH_FEATURE_CACHE_MB", "128"))
+# Disk tier directory (empty disables) and budget
+SPEECH_FEATURE_CACHE_DIR = os.getenv("SPEECH_FEATURE_CACHE_DIR", "")
+SPEECH_FEATURE_CACHE_DISK_MB = float(os.getenv("SPEECH_FEATURE_CACHE_DISK_MB", "2048"))
+
+# Part of every key; bump when resampling, normalization or VAD change so old disk entries are ignored
+PREPROCESS_VERSION = 1
+
+def fingerprint(audio, sr):
+    """Content hash of decoded samples and their sample rate"""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{sr}|{audio.dtype.str}|{audio.shape}|".encode("ascii"))
+    digest.update(np.ascontiguousarray(audio).data)
+    return digest.hexdigest()
+
+class FeatureCache:
+    """Two-tier LRU cache of (array, trimmed_ratio) entries with byte budgets"""
+
+    def __init__(self, memory_bytes, disk_dir=None, disk_bytes=0):
+        self.memory_bytes = max(0, int(memory_bytes))
+        self.disk_dir = disk_dir or None
+        self.disk_bytes = max(0, int(disk_bytes))
+        self._memory = OrderedDict()
+        self._memory_used = 0
+        self._disk = OrderedDict()
+        self._disk_used = 0
+        self._lock = threading.Lock()
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._scan_disk()
+
+    @property
+    def enabled(self):
+        return self.memory_bytes > 0 or self.disk_dir is not None
+
+    def _scan_disk(self):
+        """Index existing files, oldest use first"""
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if name.endswith(".npz"):
+                stat = os.stat(os.path.join(self.disk_dir, name))
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_used += size
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.npz")
+
+    def get(self, key):
+        """Return (array, trimmed_ratio) or None; the array is a copy the caller may modify"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits["memory"] += 1
+                return entry[0].copy(), entry[1]
+            on_disk = key in self._disk
+
+        if on_disk:
+            path = self._disk_path(key)
+            try:
+                with np.load(path) as stored:
+                    entry = (stored["audio"], float(stored["trimmed_ratio"]))
+                os.utime(path)
+            except (OSError, ValueError, KeyError):
+                with self._lock:
+                    self._disk_used -= self._disk.pop(key, 0)
+            else:
+                with self._lock:
+                    if key in self._disk:
+                        self._disk.move_to_end(key)
+                    self.hits["disk"] += 1
+                    self._put_memory(key, entry)
+                return entry[0].copy(), entry[1]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, audio, trimmed_ratio):
+        if not self.enabled:
+            return
+
+        entry = (audio.copy(), trimmed_ratio)
+        with self._lock:
+            self._put_memory(key, entry)
+            if self.disk_dir is None or key in self._disk:
+                return
+
+        path = self._disk_path(key)
+        # Write then rename so readers never see a partial file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, audio=audio, trimmed_ratio=np.float64(trimmed_ratio))
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._disk[key] = os.path.getsize(path)
+            self._disk_used += self._disk[key]
+            while self._disk_used > self.disk_bytes and len(self._disk) > 1:
+                old_key, size = self._disk.popitem(last=False)
+                self._disk_used -= size
+                try:
+                    os.remove(self._disk_path(old_key))
+                except FileNotFoundError:
+                    pass
+
+    def _put_memory(self, key, entry):
+        """Insert into the memory tier (caller holds the lock)"""
+        size = entry[0].nbytes
+        if size > self.memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_used -= self._memory.pop(key)[0].nbytes
+        self._memory[key] = entry
+        self._memory_used += size
+        while self._memory_used > self.memory_bytes:
+            _, (old, _) = self._memory.popitem(last=False)
+            self._memory_used -= old.nbytes
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits["memory"] + self.hits["disk"] + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "memory_mb": round(self._memory_used / 2**20, 2),
+                "disk_entries": len(self._disk),
+                "disk_mb": round(self._disk_used / 2**20, 2),
+                "memory_hits": self.hits["memory"],
+                "disk_hits": self.hits["disk"],
+                "misses": self.misses,
+                "hit_rate": (self.hits["memory"] + self.hits["disk"]) / lookups if lookups else 0.0,
+            }
+
+feature_cache = FeatureCache(
+    SPEECH_FEATURE_CACHE_MB * 2**20, SPEECH_FEATURE_CACHE_DIR, SPEECH_FEATURE_CACHE_DISK_MB * 2**20
+)
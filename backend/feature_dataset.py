@@ -0,0 +1,104 @@
+"""
+Memory-mapped feature dataset
+Features live in one contiguous float32 matrix on disk, indexed by per-sample frame offsets
+so training can stream batches without loading the corpus into RAM
+"""
+
+import json
+import os
+import numpy as np
+
+FEATURES_FILE = "features.f32"
+OFFSETS_FILE = "offsets.npy"
+LABELS_FILE = "labels.npy"
+META_FILE = "meta.json"
+
+def write_dataset(out_dir, items):
+    """Stream (features, label) pairs to out_dir; features are (dim,) vectors or (frames, dim) sequences"""
+    os.makedirs(out_dir, exist_ok=True)
+    offsets = [0]
+    labels = []
+    dim = None
+
+    with open(os.path.join(out_dir, FEATURES_FILE), "wb") as f:
+        for features, label in items:
+            features = np.asarray(features, dtype=np.float32)
+            frames = features.reshape(-1, features.shape[-1])
+            if dim is None:
+                dim = frames.shape[1]
+            elif frames.shape[1] != dim:
+                raise ValueError(f"Feature dimension mismatch: expected {dim}, got {frames.shape[1]}")
+
+            f.write(frames.tobytes())
+            offsets.append(offsets[-1] + len(frames))
+            labels.append(label)
+
+    # Sorted label names match sklearn's LabelEncoder ordering
+    label_names = sorted(set(labels))
+    label_ids = {name: i for i, name in enumerate(label_names)}
+    offsets = np.asarray(offsets, dtype=np.int64)
+
+    np.save(os.path.join(out_dir, OFFSETS_FILE), offsets)
+    np.save(os.path.join(out_dir, LABELS_FILE), np.asarray([label_ids[l] for l in labels], dtype=np.int32))
+    with open(os.path.join(out_dir, META_FILE), "w") as f:
+        json.dump({
+            "dim": dim or 0,
+            "count": len(labels),
+            "total_frames": int(offsets[-1]),
+            "fixed_length": bool(np.all(np.diff(offsets) == 1)),
+            "label_names": label_names,
+        }, f, indent=2)
+
+class FeatureDataset:
+    """Read-only view over a dataset written by write_dataset"""
+
+    def __init__(self, path):
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+
+        self.path = path
+        self.dim = meta["dim"]
+        self.label_names = meta["label_names"]
+        self.fixed_length = meta["fixed_length"]
+        self.offsets = np.load(os.path.join(path, OFFSETS_FILE))
+        self.labels = np.load(os.path.join(path, LABELS_FILE))
+
+        if meta["total_frames"]:
+            self.features = np.memmap(
+                os.path.join(path, FEATURES_FILE), dtype=np.float32, mode="r",
+                shape=(meta["total_frames"], self.dim)
+            )
+        else:
+            self.features = np.zeros((0, self.dim), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def lengths(self):
+        """Number of frames per sample"""
+        return np.diff(self.offsets)
+
+    def __getitem__(self, i):
+        return self.features[self.offsets[i]:self.offsets[i + 1]], self.labels[i]
+
+    def batches(self, indices, batch_size, shuffle=False, seed=None):
+        """Yield (X, y) batches over indices
+
+        Fixed-length datasets give X of shape (batch, dim); sequence datasets are
+        zero-padded to the longest sample in the batch, giving (batch, frames, dim).
+        """
+        indices = np.asarray(indices)
+        if shuffle:
+            indices = np.random.default_rng(seed).permutation(indices)
+
+        for start in range(0, len(indices), batch_size):
+            batch = indices[start:start + batch_size]
+            if self.fixed_length:
+                X = np.asarray(self.features[self.offsets[batch]])
+            else:
+                lengths = self.offsets[batch + 1] - self.offsets[batch]
+                X = np.zeros((len(batch), int(lengths.max()), self.dim), dtype=np.float32)
+                for row, i in enumerate(batch):
+                    X[row, :lengths[row]] = self.features[self.offsets[i]:self.offsets[i + 1]]
+            yield X, self.labels[batch]
@@ -0,0 +1,92 @@
+"""
+On-disk feature store for speech training
+Per-file MFCC vectors are extracted in a process pool and cached by path, mtime and feature params
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+DEFAULT_FEATURE_PARAMS = {"n_mfcc": 40, "res_type": "kaiser_fast", "pooling": "mean"}
+
+def extract_mfcc(file_path, params):
+    """Load one audio file and return its MFCC features"""
+    import librosa
+
+    audio, sr = librosa.load(file_path, res_type=params["res_type"])
+    mfccs = librosa.feature.mfcc(y=audio, sr=sr, n_mfcc=params["n_mfcc"])
+    if params.get("pooling") == "mean":
+        return np.mean(mfccs.T, axis=0).astype(np.float32)
+    # Frame-level features: (frames, n_mfcc)
+    return np.ascontiguousarray(mfccs.T, dtype=np.float32)
+
+class FeatureStore:
+    """Directory of .npy feature files keyed by source file identity and feature params"""
+
+    def __init__(self, root, params=None):
+        self.root = root
+        self.params = dict(params or DEFAULT_FEATURE_PARAMS)
+        self._params_key = json.dumps(self.params, sort_keys=True)
+        os.makedirs(root, exist_ok=True)
+
+    def _path_for(self, file_path):
+        stat = os.stat(file_path)
+        identity = f"{os.path.abspath(file_path)}|{stat.st_mtime_ns}|{stat.st_size}|{self._params_key}"
+        digest = hashlib.sha1(identity.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, digest[:2], f"{digest}.npy")
+
+    def load(self, file_path):
+        """Cached features for file_path, or None if missing or stale"""
+        path = self._path_for(file_path)
+        if not os.path.exists(path):
+            return None
+        try:
+            return np.load(path)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, file_path, features):
+        path = self._path_for(file_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so an interrupted run never leaves a truncated file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, features)
+        os.replace(tmp_path, path)
+
+    def iter_extract(self, file_paths, workers=None):
+        """Yield (file_path, features) one at a time, in input order; only new or changed files are processed"""
+        file_paths = list(file_paths)
+        missing = [path for path in file_paths if not os.path.exists(self._path_for(path))]
+        print(f"Feature store: {len(file_paths) - len(missing)} cached, {len(missing)} to extract")
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {path: pool.submit(extract_mfcc, path, self.params) for path in missing}
+            extracted = 0
+            for file_path in file_paths:
+                future = futures.pop(file_path, None)
+                try:
+                    if future is None:
+                        features = self.load(file_path)
+                        if features is not None:
+                            yield file_path, features
+                            continue
+                        # Unreadable cache file: extract it again here
+                        features = extract_mfcc(file_path, self.params)
+                    else:
+                        features = future.result()
+                        extracted += 1
+                except Exception as e:
+                    print(f"Error processing {os.path.basename(file_path)}: {e}")
+                    continue
+
+                self.save(file_path, features)
+                yield file_path, features
+                if future is not None and extracted % 200 == 0:
+                    print(f"  extracted {extracted}/{len(missing)}")
+
+    def extract(self, file_paths, workers=None):
+        """Return {file_path: features} for every file that could be processed"""
+        return dict(self.iter_extract(file_paths, workers))
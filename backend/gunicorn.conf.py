@@ -0,0 +1,46 @@
+"""
+Gunicorn config for multi-worker serving
+Models load once in the master process (preload_app) and workers are forked afterwards,
+so every worker shares the same read-only weights through copy-on-write. The port only binds
+once the models are loaded, so use this with more than one worker; a single worker is better
+served by plain uvicorn with background loading
+
+    WEB_CONCURRENCY=4 gunicorn main:app -c gunicorn.conf.py
+"""
+
+import gc
+import os
+
+# Load the models in the master before forking; background/lazy loading would give
+# each worker its own copy
+os.environ.setdefault("MODEL_LOADING", "eager")
+# Tokenizer thread pools don't survive fork
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+# Model loading happens before workers start, so only requests count against this
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+# torch threads per worker, so workers together don't oversubscribe the cores
+TORCH_THREADS_PER_WORKER = int(os.getenv("TORCH_THREADS_PER_WORKER", str(max(1, (os.cpu_count() or 1) // workers))))
+
+# Keep the collector from touching objects while the models load; they're frozen before fork
+gc.disable()
+
+def when_ready(server):
+    from model_loader import LOADERS, prepare_for_fork
+
+    prepare_for_fork()
+    for loader in LOADERS:
+        server.log.info(f"{loader.name} model: {loader.state}")
+
+def post_fork(server, worker):
+    gc.enable()
+    try:
+        import torch
+        torch.set_num_threads(TORCH_THREADS_PER_WORKER)
+    except ImportError:
+        pass
@@ -0,0 +1,214 @@
+"""
+Inference helpers built on top of the model singletons
+"""
+
+import numpy as np
+
+from emotion_mapping import GO_EMOTIONS_LABELS, text_score_matrix, map_text_probs, map_speech_results
+from audio_io import decode_wav, preprocess, encode_wav, TARGET_SAMPLE_RATE
+from vad import VAD_AGGRESSIVENESS, trim_silence
+from text_buckets import supports_bucketing, classify
+from sentences import TEXT_SENTENCE_SPLIT, TEXT_SENTENCE_CACHE_SIZE, split_sentences, compose
+from cache import ResultCache, text_key
+from feature_cache import PREPROCESS_VERSION, feature_cache, fingerprint
+from segmentation import (
+    SEGMENT_BATCH_SIZE, iter_fixed_segments, iter_vad_segments, aggregate_segments,
+)
+from model_backends import INFERENCE_BACKEND, TEXT_MODEL_ID, SPEECH_MODEL_ID
+from model_loader import text_loader, speech_loader
+from metrics import STAGE_SECONDS, BATCH_SIZE
+
+# Model identities, used to key cached predictions
+TEXT_MODEL_KEY = f"{TEXT_MODEL_ID}@{INFERENCE_BACKEND}"
+SPEECH_MODEL_KEY = f"{SPEECH_MODEL_ID}@{INFERENCE_BACKEND}"
+
+# Per-sentence (labels, probabilities) rows; keyed by model, so entries never go stale
+sentence_cache = ResultCache(TEXT_SENTENCE_CACHE_SIZE, ttl_seconds=0)
+
+def _classify_texts(classifier, texts):
+    """Classifier probabilities for texts as ((n, labels) array, label names)"""
+    if supports_bucketing(classifier):
+        # Tokenize once, pad within length buckets and chunk over-length texts
+        return classify(classifier, texts)
+
+    BATCH_SIZE.observe(len(texts), modality="text")
+    # Tokenization and forward pass both happen inside the pipeline
+    with STAGE_SECONDS.time(modality="text", stage="inference"):
+        outputs = classifier(texts, batch_size=len(texts), truncation=True, top_k=None)
+    return text_score_matrix(outputs), GO_EMOTIONS_LABELS
+
+def _predict_by_sentence(classifier, texts):
+    """Compose each text's scores from its sentences, classifying only uncached ones"""
+    split = [split_sentences(text) for text in texts]
+
+    rows = {}
+    missing = []
+    for sentence in dict.fromkeys(sentence for sentences in split for sentence in sentences):
+        cached = sentence_cache.get(text_key(sentence, TEXT_MODEL_KEY))
+        if cached is not None:
+            rows[sentence] = cached
+        else:
+            missing.append(sentence)
+
+    if missing:
+        probs, labels = _classify_texts(classifier, missing)
+        labels = tuple(labels)
+        for sentence, row in zip(missing, probs):
+            # A copy, so a cached row doesn't keep the whole batch matrix alive
+            row = row.copy()
+            rows[sentence] = (labels, row)
+            sentence_cache.put(text_key(sentence, TEXT_MODEL_KEY), (labels, row))
+
+    with STAGE_SECONDS.time(modality="text", stage="label_mapping"):
+        sentences = [sentence for sentences in split for sentence in sentences]
+        labels = rows[sentences[0]][0]
+        sentence_probs = np.stack([rows[sentence][1] for sentence in sentences])
+        # Longer sentences carry more of the message
+        weights = np.array([len(sentence) for sentence in sentences], dtype=np.float32)
+        results = map_text_probs(compose(sentence_probs, [len(parts) for parts in split], weights), labels)
+        breakdown = iter(map_text_probs(sentence_probs, labels))
+
+        return [
+            {**result, "sentences": [{"text": sentence, **next(breakdown)} for sentence in parts]}
+            for result, parts in zip(results, split)
+        ]
+
+def predict_text_batch(texts):
+    """Run a list of texts through the text classifier, bucketed by token length"""
+    texts = list(texts)
+    if not texts:
+        return []
+
+    text_model = text_loader.get()
+
+    try:
+        if TEXT_SENTENCE_SPLIT:
+            return _predict_by_sentence(text_model.classifier, texts)
+        probs, labels = _classify_texts(text_model.classifier, texts)
+    except Exception as e:
+        print(f"Batched text inference error: {e}")
+        return [{"error": str(e)} for _ in texts]
+
+    with STAGE_SECONDS.time(modality="text", stage="label_mapping"):
+        return map_text_probs(probs, labels)
+
+def _predict_prepared(speech_model, audio, sr):
+    """Run one preprocessed clip through the speech model"""
+    # Prefer an array entry point on the model; otherwise hand the file-based
+    # API an in-memory WAV so nothing is written to disk
+    predict_array = getattr(speech_model, "predict_array", None)
+    if predict_array is not None:
+        with STAGE_SECONDS.time(modality="audio", stage="inference"):
+            return predict_array(audio, sr)
+
+    with STAGE_SECONDS.time(modality="audio", stage="encode"):
+        buffer = encode_wav(audio, sr)
+    with STAGE_SECONDS.time(modality="audio", stage="inference"):
+        return speech_model.predict(buffer)
+
+def _prepare(audio, sr, vad_aggressiveness, use_cache=True):
+    """Preprocess to 16 kHz and drop non-speech; returns (audio, trimmed_ratio)"""
+    key = None
+    if use_cache and feature_cache.enabled:
+        # Identical samples (re-sent clips, archived audio) skip resampling and VAD
+        with STAGE_SECONDS.time(modality="audio", stage="fingerprint"):
+            key = f"{fingerprint(audio, sr)}-v{PREPROCESS_VERSION}-vad{vad_aggressiveness}"
+            cached = feature_cache.get(key)
+        if cached is not None:
+            return cached
+
+    audio, sr = preprocess(audio, sr)
+    with STAGE_SECONDS.time(modality="audio", stage="vad"):
+        audio, trimmed_ratio = trim_silence(audio, sr, vad_aggressiveness)
+    if key is not None:
+        feature_cache.put(key, audio, trimmed_ratio)
+    return audio, trimmed_ratio
+
+def predict_speech_array(audio, sr, vad_aggressiveness=VAD_AGGRESSIVENESS, use_cache=True):
+    """Predict emotion from a decoded float32 waveform at any sample rate
+
+    use_cache=False skips the feature cache, for audio that won't be seen again (stream windows).
+    """
+    audio, trimmed_ratio = _prepare(audio, sr, vad_aggressiveness, use_cache)
+    speech_model = speech_loader.get()
+    BATCH_SIZE.observe(1, modality="audio")
+    result = _predict_prepared(speech_model, audio, TARGET_SAMPLE_RATE)
+    if "error" in result:
+        return result
+    with STAGE_SECONDS.time(modality="audio", stage="label_mapping"):
+        result = map_speech_results([result])[0]
+    return {**result, "trimmed_ratio": trimmed_ratio}
+
+def predict_speech_batch(clips, sr, vad_aggressiveness=VAD_AGGRESSIVENESS):
+    """Predict emotion for several waveforms
+
+    One forward pass when the model has predict_batch; otherwise (the current speech model)
+    the clips are scored one after another.
+    """
+    if not clips:
+        return []
+
+    prepared = [_prepare(audio, sr, vad_aggressiveness) for audio in clips]
+    clips = [audio for audio, _ in prepared]
+    speech_model = speech_loader.get()
+    BATCH_SIZE.observe(len(clips), modality="audio")
+
+    predict_batch = getattr(speech_model, "predict_batch", None)
+    if predict_batch is not None:
+        with STAGE_SECONDS.time(modality="audio", stage="inference"):
+            results = predict_batch(clips, TARGET_SAMPLE_RATE)
+    else:
+        results = [_predict_prepared(speech_model, audio, TARGET_SAMPLE_RATE) for audio in clips]
+
+    with STAGE_SECONDS.time(modality="audio", stage="label_mapping"):
+        results = map_speech_results(results)
+    return [
+        result if "error" in result else {**result, "trimmed_ratio": trimmed_ratio}
+        for result, (_, trimmed_ratio) in zip(results, prepared)
+    ]
+
+def predict_speech_file(fileobj, vad_aggressiveness=VAD_AGGRESSIVENESS):
+    """Decode an uploaded WAV file object in memory and predict its emotion"""
+    fileobj.seek(0)
+    with STAGE_SECONDS.time(modality="audio", stage="decode"):
+        audio, sr = decode_wav(fileobj)
+    if audio.size == 0:
+        raise ValueError("Audio contains no samples")
+    return predict_speech_array(audio, sr, vad_aggressiveness)
+
+def _segment_windows(fileobj, segment_seconds, method, vad_aggressiveness):
+    """Yield (start_seconds, audio, sr) windows for the chosen segmentation method"""
+    if method == "fixed":
+        yield from iter_fixed_segments(fileobj, segment_seconds)
+    else:
+        yield from iter_vad_segments(fileobj, segment_seconds, vad_aggressiveness)
+
+def predict_speech_timeline(fileobj, segment_seconds, method="fixed", vad_aggressiveness=VAD_AGGRESSIVENESS):
+    """Per-segment emotion timeline plus an aggregated summary for a long recording"""
+    fileobj.seek(0)
+    segments = []
+    pending = []
+
+    def flush():
+        # Windows in a group share a sample rate, since they come from one file
+        sr = pending[0][3]
+        results = predict_speech_batch([audio for _, _, audio, _ in pending], sr, vad_aggressiveness)
+        for (start, end, _, _), result in zip(pending, results):
+            if "error" in result:
+                raise RuntimeError(result["error"])
+            segments.append({"start": round(start, 3), "end": round(end, 3), **result})
+        pending.clear()
+
+    # Only SEGMENT_BATCH_SIZE windows are held in memory at once
+    for start, audio, sr in _segment_windows(fileobj, segment_seconds, method, vad_aggressiveness):
+        pending.append((start, start + len(audio) / sr, audio, sr))
+        if len(pending) >= SEGMENT_BATCH_SIZE:
+            flush()
+    if pending:
+        flush()
+
+    if not segments:
+        raise ValueError("Audio contains no segments to analyze")
+
+    summary = aggregate_segments(segments)
+    return {**summary, "segments": segments}
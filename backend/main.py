@@ -1,13 +1,148 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel, validator
-import shutil
+from typing import Any, List
+import asyncio
 import os
-from models.text_model import text_model
-from models.speech_model import speech_model
+import time
+from concurrent.futures import ThreadPoolExecutor
+from batching import MicroBatcher
+from executor import InferenceExecutor, QueueFullError, run_to_completion
+from model_loader import (
+    MODEL_LOADING, LOADERS, ModelUnavailableError, ModelLoadError, load_all, start_background_loading,
+)
+from cache import ResultCache, text_key, file_key
+from inference import (
+    predict_text_batch, predict_speech_array, predict_speech_file, predict_speech_timeline,
+    TEXT_MODEL_KEY, SPEECH_MODEL_KEY, sentence_cache,
+)
+from streaming import StreamSession
+from segmentation import SEGMENT_SECONDS, SEGMENT_METHODS
+from vad import VAD_AGGRESSIVENESS
+from upload import receive_wav_upload
+from feature_cache import feature_cache
+from model_server import INFERENCE_MODE, REMOTE_LOADERS, remote_function, start_status_polling
+from emotion_mapping import fuse_scores
+from metrics import Gauge, REQUEST_SECONDS, STAGE_SECONDS, PREDICTION_ERRORS, render_metrics
+
+# Inference thread pools (worker count and queue-depth limit per modality)
+TEXT_INFERENCE_WORKERS = int(os.getenv("TEXT_INFERENCE_WORKERS", "1"))
+TEXT_QUEUE_LIMIT = int(os.getenv("TEXT_QUEUE_LIMIT", "64"))
+AUDIO_INFERENCE_WORKERS = int(os.getenv("AUDIO_INFERENCE_WORKERS", "1"))
+AUDIO_QUEUE_LIMIT = int(os.getenv("AUDIO_QUEUE_LIMIT", "4"))
+
+# Micro-batching window for /predict/text
+TEXT_BATCH_MAX_SIZE = int(os.getenv("TEXT_BATCH_MAX_SIZE", "16"))
+TEXT_BATCH_MAX_WAIT_MS = float(os.getenv("TEXT_BATCH_MAX_WAIT_MS", "10"))
+
+# Limits for /predict/text/batch
+TEXT_BATCH_MAX_ITEMS = int(os.getenv("TEXT_BATCH_MAX_ITEMS", "1000"))
+TEXT_BATCH_CHUNK_SIZE = int(os.getenv("TEXT_BATCH_CHUNK_SIZE", "32"))
+
+# Prediction caches (0 entries disables a cache, 0 TTL keeps entries until evicted)
+TEXT_CACHE_SIZE = int(os.getenv("TEXT_CACHE_SIZE", "4096"))
+AUDIO_CACHE_SIZE = int(os.getenv("AUDIO_CACHE_SIZE", "256"))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "3600"))
+
+# Share of the text distribution in /predict/multimodal's fused scores (speech gets the rest)
+MULTIMODAL_TEXT_WEIGHT = float(os.getenv("MULTIMODAL_TEXT_WEIGHT", "0.5"))
+
+# Default sliding window for /ws/audio streaming sessions
+STREAM_WINDOW_MS = int(os.getenv("STREAM_WINDOW_MS", "1000"))
+STREAM_HOP_MS = int(os.getenv("STREAM_HOP_MS", "500"))
+
+# In servers mode inference is forwarded to model_server.py processes, one per modality
+if INFERENCE_MODE == "servers":
+    predict_text_batch = remote_function("text", "predict_text_batch")
+    predict_speech_array = remote_function("speech", "predict_speech_array")
+    predict_speech_file = remote_function("speech", "predict_speech_file")
+    predict_speech_timeline = remote_function("speech", "predict_speech_timeline")
+    LOADERS = REMOTE_LOADERS
 
 app = FastAPI(title="AI Emotion Recognition API")
 
+text_executor = InferenceExecutor("text", TEXT_INFERENCE_WORKERS, TEXT_QUEUE_LIMIT)
+audio_executor = InferenceExecutor("audio", AUDIO_INFERENCE_WORKERS, AUDIO_QUEUE_LIMIT)
+# Hashing uploads (plain file reads, no model)
+io_pool = ThreadPoolExecutor(thread_name_prefix="upload-io")
+
+text_batcher = MicroBatcher(
+    predict_text_batch,
+    max_batch_size=TEXT_BATCH_MAX_SIZE,
+    max_wait_ms=TEXT_BATCH_MAX_WAIT_MS,
+    executor=text_executor,
+    max_pending=TEXT_QUEUE_LIMIT,
+)
+
+text_cache = ResultCache(TEXT_CACHE_SIZE, CACHE_TTL_SECONDS)
+audio_cache = ResultCache(AUDIO_CACHE_SIZE, CACHE_TTL_SECONDS)
+
+Gauge("emotion_queue_depth", "Jobs running or waiting per inference pool",
+      lambda: {("text",): text_executor.depth, ("audio",): audio_executor.depth}, ("pool",))
+Gauge("emotion_batch_pending", "Text requests waiting to be batched", lambda: text_batcher.pending)
+Gauge("emotion_model_load_seconds", "Model load duration",
+      lambda: {(loader.name,): loader.load_seconds for loader in LOADERS}, ("model",))
+Gauge("emotion_model_ready", "1 when the model is loaded",
+      lambda: {(loader.name,): int(loader.ready) for loader in LOADERS}, ("model",))
+Gauge("emotion_cache_entries", "Cached predictions",
+      lambda: {("text",): text_cache.stats()["entries"], ("audio",): audio_cache.stats()["entries"],
+               ("sentence",): sentence_cache.stats()["entries"]}, ("cache",))
+
+# /predict/audio reads the multipart body itself, so describe the upload for the docs
+AUDIO_UPLOAD_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+MULTIMODAL_UPLOAD_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["text", "file"],
+                    "properties": {
+                        "text": {"type": "string"},
+                        "file": {"type": "string", "format": "binary"},
+                    },
+                }
+            }
+        },
+    }
+}
+
+def server_busy(e):
+    """503 response used when inference is unavailable (queue full or model not ready)"""
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+# Load models according to MODEL_LOADING (eager blocks here, before the port is bound);
+# model servers load their own
+if MODEL_LOADING == "eager" and INFERENCE_MODE != "servers":
+    load_all()
+
+# Lazy models only load once a request needs them, so not having started yet counts as ready
+READY_STATES = ("ready", "pending") if MODEL_LOADING == "lazy" and INFERENCE_MODE != "servers" else ("ready",)
+
+@app.on_event("startup")
+async def load_models():
+    if INFERENCE_MODE == "servers":
+        # /health, /ready and /metrics read the polled status instead of calling the servers
+        start_status_polling()
+    elif MODEL_LOADING == "background":
+        start_background_loading()
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -17,16 +152,47 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    REQUEST_SECONDS.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        route=route.path if route else "unmatched",
+        status=response.status_code,
+    )
+    return response
+
+def validate_text(v):
+    """Shared text validation rules for single and batch requests"""
+    if not isinstance(v, str):
+        raise ValueError('Text must be a string')
+    if not v or not v.strip():
+        raise ValueError('Text cannot be empty')
+    if len(v) > 5000:
+        raise ValueError('Text too long (max 5000 characters)')
+    return v.strip()
+
 class TextRequest(BaseModel):
     text: str
     
     @validator('text')
     def text_must_not_be_empty(cls, v):
-        if not v or not v.strip():
-            raise ValueError('Text cannot be empty')
-        if len(v) > 5000:
-            raise ValueError('Text too long (max 5000 characters)')
-        return v.strip()
+        return validate_text(v)
+
+class TextBatchRequest(BaseModel):
+    # Items are checked one by one in the endpoint, so a bad item only fails itself
+    texts: List[Any]
+    
+    @validator('texts')
+    def texts_within_limits(cls, v):
+        if not v:
+            raise ValueError('At least one text is required')
+        if len(v) > TEXT_BATCH_MAX_ITEMS:
+            raise ValueError(f'Too many texts (max {TEXT_BATCH_MAX_ITEMS} per request)')
+        return v
 
 @app.get("/")
 async def root():
@@ -34,81 +200,183 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "models": {
-            "text": "loaded" if text_model.classifier else "error",
-            "speech": "loaded" if speech_model.model else "error"
+    """Liveness check: 200 while the server can serve or is still getting there
+
+    A model that failed to load with no retries left makes it 503, so the platform restarts the process.
+    """
+    models = {loader.name: loader.status() for loader in LOADERS}
+    broken = any(model["state"] == "failed" and not model.get("retrying") for model in models.values())
+    content = {
+        "status": "unhealthy" if broken else "healthy",
+        "models": models,
+        "cache": {
+            "text": text_cache.stats(),
+            "audio": audio_cache.stats(),
+            "sentence": sentence_cache.stats(),
+            "speech_features": feature_cache.stats()
         }
     }
+    return JSONResponse(status_code=503, content=content) if broken else content
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check: 200 once every model is loaded, 503 before that"""
+    models = {loader.name: loader.status() for loader in LOADERS}
+    if all(model["state"] in READY_STATES for model in models.values()):
+        return {"status": "ready", "models": models}
+    return JSONResponse(status_code=503, content={"status": "not ready", "models": models})
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+async def cached_text_prediction(text):
+    """Text prediction from the cache, or through the micro-batcher"""
+    key = text_key(text, TEXT_MODEL_KEY)
+    result = text_cache.get(key)
+    if result is None:
+        result = await text_batcher.submit(text)
+        
+        if "error" in result:
+            raise HTTPException(status_code=500, detail=result["error"])
+        text_cache.put(key, result)
+    return result
+
+async def cached_audio_prediction(fileobj, vad_aggressiveness, segment=False,
+                                  segment_seconds=SEGMENT_SECONDS, segment_method="fixed"):
+    """Audio prediction from the cache, or on the audio inference pool"""
+    # Identical uploads (e.g. retried recordings) are served from the cache
+    with STAGE_SECONDS.time(modality="audio", stage="hash"):
+        key = await run_to_completion(io_pool, file_key, fileobj, SPEECH_MODEL_KEY)
+    key = f"{key}:vad{vad_aggressiveness}"
+    if segment:
+        key = f"{key}:segments:{segment_method}:{segment_seconds}"
+    result = audio_cache.get(key)
+    
+    if result is None:
+        # Decode in memory and predict
+        if segment:
+            result = await audio_executor.run(
+                predict_speech_timeline, fileobj, segment_seconds, segment_method, vad_aggressiveness
+            )
+        else:
+            result = await audio_executor.run(predict_speech_file, fileobj, vad_aggressiveness)
+        
+        if "error" in result:
+            raise HTTPException(status_code=500, detail=result["error"])
+        audio_cache.put(key, result)
+    return result
 
 @app.post("/predict/text")
 async def predict_text(request: TextRequest):
     """Predict emotion from text"""
     try:
-        result = text_model.predict(request.text)
-        
-        if "error" in result:
-            raise HTTPException(status_code=500, detail=result["error"])
-            
+        result = await cached_text_prediction(request.text)
         return {"status": "success", "data": result}
         
+    except HTTPException:
+        raise
+    except (QueueFullError, ModelUnavailableError) as e:
+        raise server_busy(e)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
+        PREDICTION_ERRORS.inc(modality="text")
         print(f"Text prediction error: {e}")
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
-@app.post("/predict/audio")
-async def predict_audio(file: UploadFile = File(...)):
-    """Predict emotion from audio file"""
-    temp_file = None
+@app.post("/predict/text/batch")
+async def predict_text_batch_endpoint(request: TextBatchRequest):
+    """Predict emotion for a list of texts, with per-item results"""
+    results = [None] * len(request.texts)
+    valid = []
+    
+    # Validate each item on its own so one bad text doesn't fail the batch
+    for index, text in enumerate(request.texts):
+        try:
+            text = validate_text(text)
+        except ValueError as e:
+            results[index] = {"index": index, "status": "error", "detail": str(e)}
+            continue
+        
+        key = text_key(text, TEXT_MODEL_KEY)
+        cached = text_cache.get(key)
+        if cached is not None:
+            results[index] = {"index": index, "status": "success", "data": cached}
+        else:
+            valid.append((index, text, key))
+    
+    # Chunks run concurrently, one per text worker
+    slots = asyncio.Semaphore(TEXT_INFERENCE_WORKERS)
+    
+    async def run_chunk(chunk):
+        async with slots:
+            try:
+                outputs = await text_executor.run(predict_text_batch, [text for _, text, _ in chunk])
+            except (QueueFullError, ModelUnavailableError) as e:
+                # Keep what other chunks finished; these items can be retried
+                for index, _, _ in chunk:
+                    results[index] = {"index": index, "status": "busy", "detail": str(e)}
+                return
+            except ModelLoadError as e:
+                for index, _, _ in chunk:
+                    results[index] = {"index": index, "status": "error", "detail": str(e)}
+                return
+        for (index, _, key), result in zip(chunk, outputs):
+            if "error" in result:
+                results[index] = {"index": index, "status": "error", "detail": result["error"]}
+            else:
+                text_cache.put(key, result)
+                results[index] = {"index": index, "status": "success", "data": result}
+    
+    await asyncio.gather(*(
+        run_chunk(valid[start:start + TEXT_BATCH_CHUNK_SIZE])
+        for start in range(0, len(valid), TEXT_BATCH_CHUNK_SIZE)
+    ))
+    return {"status": "success", "data": results}
+
+@app.post("/predict/audio", openapi_extra=AUDIO_UPLOAD_SCHEMA)
+async def predict_audio(
+    request: Request,
+    segment: bool = False,
+    segment_seconds: float = Query(SEGMENT_SECONDS, ge=1.0, le=60.0),
+    segment_method: str = "fixed",
+    vad_aggressiveness: int = Query(VAD_AGGRESSIVENESS, ge=0, le=3),
+):
+    """Predict emotion from an uploaded WAV file, optionally as a per-segment timeline"""
+    upload = None
     
     try:
-        # Validate file type
-        if not file.filename.endswith('.wav'):
+        if segment and segment_method not in SEGMENT_METHODS:
             raise HTTPException(
-                status_code=400, 
-                detail="Only .wav files are supported. Please convert your audio to WAV format."
+                status_code=400,
+                detail=f"segment_method must be one of: {', '.join(SEGMENT_METHODS)}"
             )
         
-        # Validate file size (max 50MB)
-        if file.size and file.size > 50 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail="File too large (max 50MB)")
+        # Stream the body, rejecting bad headers, formats and oversized files as they arrive
+        upload = await receive_wav_upload(request)
+        info = upload.info
         
-        temp_file = f"temp_{file.filename}"
-        
-        print(f"Received audio file: {file.filename}, Content-Type: {file.content_type}")
-        
-        # Save uploaded file
-        with open(temp_file, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Validate file exists and has content
-        if not os.path.exists(temp_file) or os.path.getsize(temp_file) == 0:
-            raise HTTPException(status_code=400, detail="Uploaded file is empty")
-        
-        # Predict
-        result = speech_model.predict(temp_file)
-        
-        # Clean up
-        if os.path.exists(temp_file):
-            os.remove(temp_file)
+        print(
+            f"Received audio file: {upload.filename}, Content-Type: {upload.content_type}, "
+            f"{info.sample_rate} Hz, {info.channels} ch, {upload.size} bytes"
+        )
         
-        if "error" in result:
-            raise HTTPException(status_code=500, detail=result["error"])
-             
+        result = await cached_audio_prediction(
+            upload.file, vad_aggressiveness, segment, segment_seconds, segment_method
+        )
         return {"status": "success", "data": result}
         
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
+    except (QueueFullError, ModelUnavailableError) as e:
+        raise server_busy(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        # Clean up on error
-        if temp_file and os.path.exists(temp_file):
-            os.remove(temp_file)
-        
+        PREDICTION_ERRORS.inc(modality="audio")
         print(f"Audio prediction error: {e}")
         import traceback
         traceback.print_exc()
@@ -117,3 +385,151 @@ async def predict_audio(file: UploadFile = File(...)):
             status_code=500, 
             detail=f"Audio processing failed: {str(e)}"
         )
+    finally:
+        if upload is not None:
+            upload.file.close()
+
+@app.post("/predict/multimodal", openapi_extra=MULTIMODAL_UPLOAD_SCHEMA)
+async def predict_multimodal(
+    request: Request,
+    text_weight: float = Query(MULTIMODAL_TEXT_WEIGHT, ge=0.0, le=1.0),
+    vad_aggressiveness: int = Query(VAD_AGGRESSIVENESS, ge=0, le=3),
+):
+    """Predict emotion from a transcript and its recording together, with fused scores"""
+    upload = None
+    
+    try:
+        upload = await receive_wav_upload(request)
+        text = validate_text(upload.fields.get("text", ""))
+        
+        # Text and audio run concurrently on their own pools
+        tasks = [
+            asyncio.ensure_future(cached_text_prediction(text)),
+            asyncio.ensure_future(cached_audio_prediction(upload.file, vad_aggressiveness)),
+        ]
+        try:
+            text_result, audio_result = await asyncio.gather(*tasks)
+        except BaseException:
+            # Stop the other side, and wait until it is done with upload.file before it is closed
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        audio_weight = round(1.0 - text_weight, 6)
+        fused = fuse_scores(
+            [text_result["all_scores"], audio_result["all_scores"]],
+            [text_weight, audio_weight],
+        )
+        
+        return {
+            "status": "success",
+            "data": {
+                "text": text_result,
+                "audio": audio_result,
+                "fused": {**fused, "weights": {"text": text_weight, "audio": audio_weight}},
+            },
+        }
+        
+    except HTTPException:
+        raise
+    except (QueueFullError, ModelUnavailableError) as e:
+        raise server_busy(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        PREDICTION_ERRORS.inc(modality="multimodal")
+        print(f"Multimodal prediction error: {e}")
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+    finally:
+        if upload is not None:
+            upload.file.close()
+
+@app.websocket("/ws/audio")
+async def stream_audio(
+    websocket: WebSocket,
+    sample_rate: int = 16000,
+    window_ms: int = STREAM_WINDOW_MS,
+    hop_ms: int = STREAM_HOP_MS,
+    encoding: str = "pcm16",
+):
+    """Rolling speech emotion over a stream of mono PCM frames"""
+    await websocket.accept()
+    
+    try:
+        session = StreamSession(sample_rate, window_ms, hop_ms, encoding)
+    except ValueError as e:
+        await websocket.send_json({"status": "error", "detail": str(e)})
+        await websocket.close(code=1003)
+        return
+    
+    # Frames are received in their own task so they keep flowing into the session during
+    # inference; the scoring loop only ever takes the newest window once it is free
+    latest = None
+    window_ready = asyncio.Event()
+    
+    async def receive_frames():
+        nonlocal latest
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return False
+                if message.get("text") == "end":
+                    return True
+                if not message.get("bytes"):
+                    continue
+                
+                windows = session.push(message["bytes"])
+                if windows:
+                    latest = windows[-1]
+                    window_ready.set()
+        finally:
+            window_ready.set()
+    
+    receiver = asyncio.create_task(receive_frames())
+    try:
+        while True:
+            if latest is None:
+                if receiver.done():
+                    break
+                await window_ready.wait()
+                window_ready.clear()
+                continue
+            
+            start, window = latest
+            latest = None
+            try:
+                # Stream windows never repeat, so caching them would only evict useful entries
+                result = await audio_executor.run(
+                    predict_speech_array, window, session.sample_rate, use_cache=False
+                )
+            except (QueueFullError, ModelUnavailableError) as e:
+                await websocket.send_json({"status": "busy", "detail": str(e)})
+                continue
+            
+            if "error" in result:
+                await websocket.send_json({"status": "error", "detail": result["error"]})
+                continue
+            
+            await websocket.send_json({
+                "status": "success",
+                "data": {
+                    **result,
+                    "start": start / session.sample_rate,
+                    "end": (start + len(window)) / session.sample_rate,
+                },
+            })
+        
+        # Client sent "end": close once its last window has been scored
+        if await receiver:
+            await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    except ModelLoadError as e:
+        await websocket.send_json({"status": "error", "detail": str(e)})
+        await websocket.close(code=1011)
+    except Exception as e:
+        print(f"Audio stream error: {e}")
+        await websocket.close(code=1011)
+    finally:
+        receiver.cancel()
@@ -0,0 +1,190 @@
+"""
+Selectable CPU inference backends
+pytorch (default), int8 (dynamic quantization of Linear layers) or onnx (ONNX Runtime via optimum)
+
+Run directly to measure the accuracy/latency delta against the PyTorch path:
+    python model_backends.py --backend int8 [--texts-file texts.txt] [--audio-dir clips/]
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+TEXT_MODEL_ID = "SamLowe/roberta-base-go_emotions"
+SPEECH_MODEL_ID = "ehcalabres/wav2vec2-lg-xlsr-en-speech-emotion-recognition"
+
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "pytorch")
+ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", "onnx_cache")
+BACKENDS = ("pytorch", "int8", "onnx")
+
+SAMPLE_TEXTS = [
+    "I'm so happy and excited about this!",
+    "I can't stop crying",
+    "Why don't you just listen to me?!",
+    "I'm terrified of what might happen",
+    "Wow, I didn't expect that!",
+    "The meeting is at 3pm",
+    "That's absolutely disgusting",
+    "I love you so much",
+    "I have no idea what is going on",
+    "I'm really nervous about tomorrow",
+]
+
+def quantize_dynamic(model):
+    """Copy of a torch model with Linear layers quantized to int8"""
+    import torch
+
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def load_onnx_model(model_id, task):
+    """Load an ONNX Runtime model, exporting and caching the graph on first use"""
+    try:
+        from optimum.onnxruntime import ORTModelForAudioClassification, ORTModelForSequenceClassification
+    except ImportError:
+        raise RuntimeError("The onnx backend needs optimum: pip install optimum[onnxruntime]")
+
+    model_class = ORTModelForSequenceClassification if task == "text" else ORTModelForAudioClassification
+    export_dir = os.path.join(ONNX_CACHE_DIR, model_id.replace("/", "__"))
+    if os.path.exists(os.path.join(export_dir, "model.onnx")):
+        return model_class.from_pretrained(export_dir)
+
+    print(f"Exporting {model_id} to ONNX (cached in {export_dir})...")
+    model = model_class.from_pretrained(model_id, export=True)
+    model.save_pretrained(export_dir)
+    return model
+
+def apply_text_backend(classifier, backend, model_id):
+    """Return the text classification pipeline running on the given backend"""
+    if backend == "int8":
+        classifier.model = quantize_dynamic(classifier.model)
+    elif backend == "onnx":
+        from transformers import pipeline
+
+        classifier = pipeline(
+            "text-classification", model=load_onnx_model(model_id, "text"),
+            tokenizer=classifier.tokenizer, top_k=None
+        )
+    return classifier
+
+def apply_speech_backend(model, backend, model_id):
+    """Return the speech classification model running on the given backend"""
+    if backend == "int8":
+        return quantize_dynamic(model)
+    if backend == "onnx":
+        return load_onnx_model(model_id, "audio")
+    return model
+
+def apply_backend(text_model=None, speech_model=None, backend=INFERENCE_BACKEND):
+    """Switch loaded model singletons to the selected backend, falling back to PyTorch on failure"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}' (choose from {', '.join(BACKENDS)})")
+    if backend == "pytorch":
+        return
+
+    if text_model is not None and text_model.classifier is not None:
+        try:
+            text_model.classifier = apply_text_backend(text_model.classifier, backend, TEXT_MODEL_ID)
+            print(f"Text model running on {backend} backend")
+        except Exception as e:
+            print(f"Could not switch text model to {backend}, staying on PyTorch: {e}")
+
+    if speech_model is not None and speech_model.model is not None:
+        try:
+            speech_model.model = apply_speech_backend(speech_model.model, backend, SPEECH_MODEL_ID)
+            print(f"Speech model running on {backend} backend")
+        except Exception as e:
+            print(f"Could not switch speech model to {backend}, staying on PyTorch: {e}")
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def _report(name, baseline, candidate, base_time, cand_time, count):
+    """Print agreement, score deltas and latency for two (n, labels) score matrices"""
+    agreement = float(np.mean(baseline.argmax(axis=1) == candidate.argmax(axis=1)))
+    delta = np.abs(baseline - candidate)
+    print(f"\n{name}")
+    print(f"  Top-1 agreement: {agreement*100:.1f}%")
+    print(f"  Score delta:     max {delta.max():.4f} | mean {delta.mean():.4f}")
+    print(f"  Latency/item:    pytorch {base_time/count*1000:.1f} ms | candidate {cand_time/count*1000:.1f} ms")
+    return agreement
+
+def compare_text(backend, texts, model_id):
+    from transformers import pipeline
+    from emotion_mapping import TEXT_PROJECTION, project, text_score_matrix
+
+    baseline = pipeline("text-classification", model=model_id, top_k=None)
+    candidate = apply_text_backend(
+        pipeline("text-classification", model=model_id, top_k=None), backend, model_id
+    )
+
+    def run(classifier):
+        outputs = classifier(texts, batch_size=len(texts), truncation=True)
+        return project(text_score_matrix(outputs), TEXT_PROJECTION)
+
+    # Warm up both, so neither model's first-call overhead counts as latency
+    run(baseline)
+    run(candidate)
+    base_scores, base_time = _timed(lambda: run(baseline))
+    cand_scores, cand_time = _timed(lambda: run(candidate))
+    return _report(f"Text model ({backend})", base_scores, cand_scores, base_time, cand_time, len(texts))
+
+def compare_speech(backend, audio_dir, model_id):
+    import torch
+    from transformers import AutoFeatureExtractor, AutoModelForAudioClassification
+    from audio_io import load_audio
+
+    extractor = AutoFeatureExtractor.from_pretrained(model_id)
+    baseline = AutoModelForAudioClassification.from_pretrained(model_id).eval()
+    candidate = apply_speech_backend(
+        AutoModelForAudioClassification.from_pretrained(model_id).eval(), backend, model_id
+    )
+
+    clips = []
+    for name in sorted(os.listdir(audio_dir)):
+        if name.endswith(".wav"):
+            audio, _ = load_audio(os.path.join(audio_dir, name))
+            clips.append(extractor(audio, sampling_rate=16000, return_tensors="pt"))
+    if not clips:
+        print(f"No .wav files found in {audio_dir}")
+        return 1.0
+
+    def run(model, inputs=clips):
+        with torch.no_grad():
+            return np.array([torch.softmax(model(**c).logits, dim=-1)[0].numpy() for c in inputs])
+
+    # Warm up both on one clip, so neither model's first-call overhead counts as latency
+    run(baseline, clips[:1])
+    run(candidate, clips[:1])
+    base_scores, base_time = _timed(lambda: run(baseline))
+    cand_scores, cand_time = _timed(lambda: run(candidate))
+    return _report(f"Speech model ({backend})", base_scores, cand_scores, base_time, cand_time, len(clips))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare an inference backend against PyTorch")
+    parser.add_argument("--backend", choices=BACKENDS[1:], default="int8")
+    parser.add_argument("--texts-file", help="Text file with one sample per line")
+    parser.add_argument("--audio-dir", help="Directory of .wav clips for the speech model")
+    parser.add_argument("--min-agreement", type=float, default=0.9,
+                        help="Fail if top-1 agreement drops below this fraction")
+    args = parser.parse_args()
+
+    texts = SAMPLE_TEXTS
+    if args.texts_file:
+        with open(args.texts_file, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+
+    agreements = [compare_text(args.backend, texts, TEXT_MODEL_ID)]
+    if args.audio_dir:
+        agreements.append(compare_speech(args.backend, args.audio_dir, SPEECH_MODEL_ID))
+
+    if min(agreements) < args.min_agreement:
+        print(f"\n✗ Agreement below {args.min_agreement*100:.0f}%")
+        sys.exit(1)
+    print("\n✓ Backend within tolerance")
+
+if __name__ == "__main__":
+    main()
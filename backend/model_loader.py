@@ -0,0 +1,174 @@
+"""
+Model loading lifecycle
+Loads the model singletons eagerly, in the background or on first use, and tracks per-model state
+"""
+
+import gc
+import os
+import threading
+import time
+from model_backends import INFERENCE_BACKEND, apply_backend
+
+# eager: load before the app starts serving, background: bind first and load in a
+# background thread, lazy: load when a model is first used
+MODEL_LOADING = os.getenv("MODEL_LOADING", "background")
+# Seconds a request waits for a model that is loading before getting a 503 (0: fail fast)
+MODEL_LOAD_TIMEOUT = float(os.getenv("MODEL_LOAD_TIMEOUT", "0"))
+# Failed loads are retried this many times, waiting MODEL_LOAD_RETRY_SECONDS, doubling each time
+MODEL_LOAD_RETRIES = int(os.getenv("MODEL_LOAD_RETRIES", "3"))
+MODEL_LOAD_RETRY_SECONDS = float(os.getenv("MODEL_LOAD_RETRY_SECONDS", "10"))
+
+class ModelUnavailableError(Exception):
+    """Raised when a model is still loading or waiting to retry a failed load"""
+
+class ModelLoadError(Exception):
+    """Raised when a model failed to load and no retries are left"""
+
+class ModelLoader:
+    """Loads one model, retrying failed loads, and reports pending/loading/ready/failed"""
+
+    def __init__(self, name, load_fn):
+        self.name = name
+        self._load_fn = load_fn
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self.state = "pending"
+        self.model = None
+        self.error = None
+        self.load_seconds = None
+        self.attempts = 0
+        self.retry_at = None
+
+    def load(self):
+        """Load the model in the calling thread unless another thread already started"""
+        with self._lock:
+            if self.state != "pending":
+                return
+            self.state = "loading"
+            self.attempts += 1
+            self.retry_at = None
+            self._done.clear()
+
+        print(f"Loading {self.name} model...")
+        start = time.perf_counter()
+        try:
+            self.model = self._load_fn()
+            self.error = None
+            self.state = "ready"
+            print(f"{self.name.capitalize()} model ready")
+        except Exception as e:
+            self.error = str(e)
+            self.state = "failed"
+            print(f"{self.name.capitalize()} model failed to load: {e}")
+            if self.attempts <= MODEL_LOAD_RETRIES:
+                self._schedule_retry(MODEL_LOAD_RETRY_SECONDS * 2 ** (self.attempts - 1))
+        finally:
+            self.load_seconds = time.perf_counter() - start
+            self._done.set()
+
+    def _schedule_retry(self, delay):
+        self.retry_at = time.monotonic() + delay
+        print(f"Retrying {self.name} model load in {delay:.0f}s")
+        timer = threading.Timer(delay, self._retry)
+        timer.daemon = True
+        timer.start()
+
+    def _retry(self):
+        with self._lock:
+            if self.state != "failed":
+                return
+            self.state = "pending"
+        self.load()
+
+    @property
+    def retrying(self):
+        """True while a failed load still has a retry scheduled"""
+        return self.retry_at is not None
+
+    def get(self, timeout=MODEL_LOAD_TIMEOUT):
+        """Return the loaded model, loading it now if nothing has started it yet
+
+        Raises ModelUnavailableError (worth retrying) while the model loads or waits to
+        retry, and ModelLoadError once it has failed for good.
+        """
+        if self.state == "pending":
+            self.load()
+        if self.state == "loading" and not self._done.wait(timeout):
+            raise ModelUnavailableError(f"{self.name.capitalize()} model is still loading")
+        if self.state == "ready":
+            return self.model
+        if self.retrying:
+            retry_in = max(0.0, self.retry_at - time.monotonic())
+            raise ModelUnavailableError(
+                f"{self.name.capitalize()} model failed to load ({self.error}); retrying in {retry_in:.0f}s"
+            )
+        raise ModelLoadError(f"{self.name.capitalize()} model failed to load: {self.error}")
+
+    def set_model(self, model):
+        """Install an already-built model (e.g. a stub for benchmarks) and mark it ready"""
+        with self._lock:
+            self.model = model
+            self.state = "ready"
+            self.load_seconds = 0.0
+            self._done.set()
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def status(self):
+        return {
+            "state": self.state,
+            "load_seconds": round(self.load_seconds, 2) if self.load_seconds is not None else None,
+            "error": self.error,
+            "attempts": self.attempts,
+            "retrying": self.retrying,
+        }
+
+def _load_text_model():
+    from models.text_model import text_model
+
+    if text_model.classifier is None:
+        raise RuntimeError("text classifier was not initialized")
+    apply_backend(text_model=text_model, backend=INFERENCE_BACKEND)
+    return text_model
+
+def _load_speech_model():
+    from models.speech_model import speech_model
+
+    if speech_model.model is None:
+        raise RuntimeError("speech model was not initialized")
+    apply_backend(speech_model=speech_model, backend=INFERENCE_BACKEND)
+    return speech_model
+
+text_loader = ModelLoader("text", _load_text_model)
+speech_loader = ModelLoader("speech", _load_speech_model)
+LOADERS = (text_loader, speech_loader)
+
+def load_all():
+    """Load every model in order (text first, as it is smaller)"""
+    for loader in LOADERS:
+        loader.load()
+
+def start_background_loading():
+    threading.Thread(target=load_all, name="model-loader", daemon=True).start()
+
+def _torch_modules(model):
+    """torch modules behind a model wrapper (speech_model.model, text_model.classifier.model)"""
+    candidates = (getattr(model, "model", None), getattr(getattr(model, "classifier", None), "model", None))
+    return [module for module in candidates if hasattr(module, "requires_grad_")]
+
+def prepare_for_fork():
+    """Make loaded weights copy-on-write friendly before worker processes are forked
+
+    Weights are put in inference mode so workers never write to them, and every object
+    alive now is moved out of the garbage collector's reach so its bookkeeping doesn't
+    touch (and copy) the shared pages.
+    """
+    for loader in LOADERS:
+        if loader.ready:
+            for module in _torch_modules(loader.model):
+                module.eval()
+                module.requires_grad_(False)
+    gc.collect()
+    gc.freeze()
@@ -0,0 +1,280 @@
+"""
+Per-modality model-server processes
+Hosts one model behind a Unix socket so the API process only handles HTTP and validation,
+and text and speech inference each get their own process, CPU and queue
+
+    python model_server.py text --workers 2
+    python model_server.py speech --workers 1
+    INFERENCE_MODE=servers uvicorn main:app --port 8000
+"""
+
+import argparse
+import io
+import os
+import secrets
+import stat
+import tempfile
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+from model_loader import ModelUnavailableError
+
+# inprocess: models live in the API process, servers: forward inference to model_server.py
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "inprocess")
+MODEL_SERVER_DIR = os.getenv("MODEL_SERVER_DIR", os.path.join(tempfile.gettempdir(), "emotion-model-servers"))
+# Longest a forwarded call may take before the API gives up on it
+MODEL_SERVER_TIMEOUT = float(os.getenv("MODEL_SERVER_TIMEOUT", "300"))
+# Shared secret both sides prove before any message is unpickled; by default a 0600 key file
+# the first server creates in MODEL_SERVER_DIR
+MODEL_SERVER_AUTHKEY = os.getenv("MODEL_SERVER_AUTHKEY", "")
+# Server status is polled in the background for /health, /ready and /metrics, failing fast
+STATUS_TIMEOUT = 1.0
+STATUS_POLL_SECONDS = 1.0
+
+MODALITIES = ("text", "speech")
+
+def socket_path(modality):
+    return os.path.join(MODEL_SERVER_DIR, f"{modality}.sock")
+
+def check_private_dir(path, create=False):
+    """Make sure path is a directory only the current user can reach, creating it if asked
+
+    Raises PermissionError for a directory another user owns (or could have swapped in).
+    """
+    if create:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"{path} is not a directory")
+    if info.st_uid != os.getuid():
+        raise PermissionError(f"{path} belongs to another user; set MODEL_SERVER_DIR to a private directory")
+    if info.st_mode & 0o077:
+        os.chmod(path, 0o700)
+
+def authkey(directory, create=False):
+    """MODEL_SERVER_AUTHKEY, or the key file in directory (created with mode 0600 if asked)"""
+    if MODEL_SERVER_AUTHKEY:
+        return MODEL_SERVER_AUTHKEY.encode("utf-8")
+
+    path = os.path.join(directory, "authkey")
+    if create and not os.path.exists(path):
+        # Write the whole key, then link it into place, so a concurrent reader never sees half a key
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(secrets.token_bytes(32))
+        try:
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp_path)
+
+    with open(path, "rb") as f:
+        return f.read()
+
+# --- Client side (API process) ---
+
+class ModelServerClient:
+    """Blocking calls to one model server, with a connection per calling thread
+
+    Calls run on the API's inference executor threads, so the executor's worker count
+    is also the number of requests in flight to the server.
+    """
+
+    def __init__(self, modality, address=None):
+        self.modality = modality
+        self.address = address or socket_path(modality)
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.address)
+            try:
+                check_private_dir(directory)
+                conn = Client(self.address, family="AF_UNIX", authkey=authkey(directory))
+            except (OSError, AuthenticationError) as e:
+                raise ModelUnavailableError(f"{self.modality.capitalize()} model server is unavailable: {e}")
+            self._local.conn = conn
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn.close()
+
+    def call(self, name, *args, timeout=MODEL_SERVER_TIMEOUT, **kwargs):
+        """Run name(*args, **kwargs) in the server and return its result or raise its error"""
+        # Uploads are spooled temp files, which can't be pickled; send their bytes instead
+        args = tuple(_picklable(arg) for arg in args)
+        conn = self._connection()
+        try:
+            conn.send((name, args, kwargs))
+            if not conn.poll(timeout):
+                raise TimeoutError(f"{self.modality} model server did not reply within {timeout:.0f}s")
+            status, value = conn.recv()
+        except (OSError, EOFError, TimeoutError) as e:
+            # The reply (if any) can't be matched to a request any more
+            self._drop_connection()
+            raise ModelUnavailableError(f"{self.modality.capitalize()} model server is unavailable: {e}")
+
+        if status == "error":
+            raise value
+        return value
+
+def _picklable(arg):
+    if hasattr(arg, "read") and not isinstance(arg, io.BytesIO):
+        arg.seek(0)
+        return io.BytesIO(arg.read())
+    return arg
+
+class RemoteFunction:
+    """Stands in for an inference function that runs in a model server"""
+
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.__name__ = name
+
+    def __call__(self, *args, **kwargs):
+        return self.client.call(self.name, *args, **kwargs)
+
+class RemoteLoader:
+    """Reports a model server's loader state with the same interface as ModelLoader
+
+    status() returns the last polled state, so it never blocks the event loop.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.name = client.modality
+        self._status = {"state": "pending", "load_seconds": None, "error": None}
+
+    def refresh(self):
+        """Ask the server for its state (blocking, up to STATUS_TIMEOUT)"""
+        try:
+            self._status = self.client.call("status", timeout=STATUS_TIMEOUT)
+        except ModelUnavailableError as e:
+            self._status = {"state": "unreachable", "load_seconds": None, "error": str(e)}
+
+    def status(self):
+        return self._status
+
+    @property
+    def state(self):
+        return self._status["state"]
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    @property
+    def load_seconds(self):
+        return self._status["load_seconds"]
+
+CLIENTS = {modality: ModelServerClient(modality) for modality in MODALITIES}
+REMOTE_LOADERS = tuple(RemoteLoader(CLIENTS[modality]) for modality in MODALITIES)
+
+def remote_function(modality, name):
+    return RemoteFunction(CLIENTS[modality], name)
+
+def _poll_status(interval):
+    while True:
+        for loader in REMOTE_LOADERS:
+            loader.refresh()
+        time.sleep(interval)
+
+def start_status_polling(interval=STATUS_POLL_SECONDS):
+    threading.Thread(target=_poll_status, args=(interval,), name="model-server-status", daemon=True).start()
+
+# --- Server side (model-server process) ---
+
+def _functions(modality):
+    """Inference functions a server exposes, keyed by name"""
+    import inference
+
+    if modality == "text":
+        return {"predict_text_batch": inference.predict_text_batch}
+    return {
+        "predict_speech_array": inference.predict_speech_array,
+        "predict_speech_file": inference.predict_speech_file,
+        "predict_speech_timeline": inference.predict_speech_timeline,
+    }
+
+def _serve_connection(conn, functions, loader, slots):
+    """Answer one API connection's requests in order until it closes"""
+    with conn:
+        while True:
+            try:
+                name, args, kwargs = conn.recv()
+            except (EOFError, OSError):
+                return
+
+            if name == "status":
+                reply = ("ok", loader.status())
+            elif name not in functions:
+                reply = ("error", ValueError(f"Unknown function: {name}"))
+            else:
+                try:
+                    # Cap concurrent inference, however many API connections are open
+                    with slots:
+                        reply = ("ok", functions[name](*args, **kwargs))
+                except Exception as e:
+                    reply = ("error", e)
+
+            try:
+                conn.send(reply)
+            except (EOFError, OSError):
+                return
+            except Exception as e:
+                # The exception itself wasn't picklable
+                conn.send(("error", RuntimeError(str(reply[1]) or str(e))))
+
+def serve(modality, workers=1, address=None):
+    """Load one model and serve it on a Unix socket until interrupted"""
+    from model_loader import text_loader, speech_loader
+
+    loader = text_loader if modality == "text" else speech_loader
+    functions = _functions(modality)
+    slots = threading.BoundedSemaphore(max(1, workers))
+
+    address = address or socket_path(modality)
+    directory = os.path.dirname(address)
+    check_private_dir(directory, create=True)
+    key = authkey(directory, create=True)
+    # A socket left behind by a previous run would make bind fail
+    if os.path.exists(address):
+        os.unlink(address)
+
+    # Listen first, so /ready can report "loading" while the model loads
+    with Listener(address, family="AF_UNIX", authkey=key) as listener:
+        print(f"{modality.capitalize()} model server listening on {address}")
+        threading.Thread(target=loader.load, name=f"{modality}-loader", daemon=True).start()
+        while True:
+            try:
+                conn = listener.accept()
+            except (AuthenticationError, OSError, EOFError) as e:
+                print(f"Rejected connection: {e}")
+                continue
+            threading.Thread(
+                target=_serve_connection, args=(conn, functions, loader, slots), daemon=True
+            ).start()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve one emotion model over a Unix socket")
+    parser.add_argument("modality", choices=MODALITIES)
+    parser.add_argument("--workers", type=int, default=1, help="Concurrent inference calls")
+    parser.add_argument("--socket", help=f"Socket path (default: {MODEL_SERVER_DIR}/<modality>.sock)")
+    args = parser.parse_args()
+
+    try:
+        serve(args.modality, args.workers, args.socket)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
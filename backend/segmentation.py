@@ -0,0 +1,135 @@
+"""
+Long-audio segmentation
+Splits recordings into bounded windows (fixed-length or at VAD-detected pauses) and aggregates per-segment predictions
+"""
+
+import os
+import numpy as np
+import soundfile as sf
+from audio_io import to_mono
+from vad import FRAME_SECONDS, HANGOVER_SECONDS, VAD_AGGRESSIVENESS, speech_mask
+
+SEGMENT_SECONDS = float(os.getenv("SEGMENT_SECONDS", "5"))
+SEGMENT_BATCH_SIZE = int(os.getenv("SEGMENT_BATCH_SIZE", "8"))
+MIN_SEGMENT_SECONDS = 0.5
+SEGMENT_METHODS = ("fixed", "vad")
+
+# Pauses at least this long end a VAD segment
+MIN_SILENCE_SECONDS = 0.3
+# Audio read and run through the VAD at a time when segmenting at pauses
+VAD_BLOCK_SECONDS = 30.0
+
+def _open(fileobj):
+    try:
+        return sf.SoundFile(fileobj)
+    except Exception as e:
+        raise ValueError(f"Could not decode WAV audio: {e}")
+
+def iter_fixed_segments(fileobj, segment_seconds):
+    """Yield (start_seconds, mono float32 block, sr), reading one block at a time so memory stays bounded"""
+    with _open(fileobj) as soundfile:
+        sr = soundfile.samplerate
+        frames = max(1, int(segment_seconds * sr))
+        start = 0
+        for block in soundfile.blocks(blocksize=frames, dtype="float32", always_2d=True):
+            block = to_mono(block)
+            # Fold a short tail into nothing unless it is the whole clip
+            if len(block) >= MIN_SEGMENT_SECONDS * sr or start == 0:
+                yield start / sr, block, sr
+            start += len(block)
+
+def _iter_vad_frames(soundfile, aggressiveness):
+    """Yield (frame audio, is_voiced) per VAD frame, deciding VAD_BLOCK_SECONDS of audio at a time
+
+    The last HANGOVER_SECONDS of each block are held back and decided with the next block, and
+    the frames before a block are passed along as context, so hangover works across block edges.
+    """
+    sr = soundfile.samplerate
+    frame = max(1, int(FRAME_SECONDS * sr))
+    pad = int(HANGOVER_SECONDS / FRAME_SECONDS) * frame
+    block_size = max(1, int(VAD_BLOCK_SECONDS / FRAME_SECONDS)) * frame
+
+    context = np.zeros(0, dtype=np.float32)
+    undecided = np.zeros(0, dtype=np.float32)
+    blocks = soundfile.blocks(blocksize=block_size, dtype="float32", always_2d=True)
+    block = next(blocks, None)
+    while block is not None:
+        following = next(blocks, None)
+        audio = np.concatenate((context, undecided, to_mono(block)))
+        # Drop the partial frame at the very end, like speech_mask does
+        audio = audio[:len(audio) // frame * frame]
+        mask = speech_mask(audio, sr, aggressiveness)
+
+        decide_to = len(audio) if following is None else max(len(context), len(audio) - pad)
+        for offset in range(len(context), decide_to, frame):
+            yield audio[offset:offset + frame], bool(mask[offset // frame])
+
+        context = audio[max(0, decide_to - pad):decide_to]
+        undecided = audio[decide_to:]
+        block = following
+
+def iter_vad_segments(fileobj, max_seconds, aggressiveness=VAD_AGGRESSIVENESS, min_silence=MIN_SILENCE_SECONDS):
+    """Yield (start_seconds, speech audio, sr) cut at pauses and capped at max_seconds, streaming the file"""
+    with _open(fileobj) as soundfile:
+        sr = soundfile.samplerate
+        frame = max(1, int(FRAME_SECONDS * sr))
+        min_gap = max(1, int(min_silence / FRAME_SECONDS))
+        max_frames = max(1, int(max_seconds / FRAME_SECONDS))
+        min_frames = int(MIN_SEGMENT_SECONDS / FRAME_SECONDS)
+
+        # The open segment: its first frame index and its frames so far (trailing pause included)
+        start = None
+        parts = []
+        gap = 0
+
+        def close(keep):
+            if keep >= min_frames:
+                return start * frame / sr, np.concatenate(parts[:keep]), sr
+            return None
+
+        for i, (audio, is_voiced) in enumerate(_iter_vad_frames(soundfile, max(1, aggressiveness))):
+            segment = None
+            if is_voiced:
+                if start is None:
+                    start = i
+                gap = 0
+            elif start is not None:
+                gap += 1
+                if gap >= min_gap:
+                    # Leave the pause out of the segment
+                    segment = close(len(parts) - gap + 1)
+                    start, parts = None, []
+            if start is not None:
+                parts.append(audio)
+                if len(parts) >= max_frames:
+                    segment = close(len(parts))
+                    start, parts = None, []
+            if segment is not None:
+                yield segment
+
+        if start is not None:
+            segment = close(len(parts))
+            if segment is not None:
+                yield segment
+
+def aggregate_segments(segments):
+    """Duration-weighted average of per-segment scores"""
+    totals = {}
+    total_duration = 0.0
+    for segment in segments:
+        duration = segment["end"] - segment["start"]
+        total_duration += duration
+        for emotion, score in segment["all_scores"].items():
+            totals[emotion] = totals.get(emotion, 0.0) + score * duration
+
+    if not totals or total_duration == 0:
+        return None
+    all_scores = {emotion: value / total_duration for emotion, value in totals.items()}
+    emotion = max(all_scores, key=all_scores.get)
+    trimmed = sum(s.get("trimmed_ratio", 0.0) * (s["end"] - s["start"]) for s in segments)
+    return {
+        "emotion": emotion,
+        "confidence": all_scores[emotion],
+        "all_scores": all_scores,
+        "trimmed_ratio": trimmed / total_duration,
+    }
@@ -0,0 +1,86 @@
+"""
+Streaming audio sessions
+Buffers incoming PCM frames and yields sliding windows for rolling predictions
+"""
+
+import numpy as np
+
+SAMPLE_FORMATS = {
+    "pcm16": (np.dtype("<i2"), 1.0 / 32768.0),
+    "f32": (np.dtype("<f4"), 1.0),
+}
+
+class RingBuffer:
+    """Fixed-size float32 buffer that keeps the most recent samples"""
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self._data = np.zeros(self.capacity, dtype=np.float32)
+        self._written = 0
+
+    def __len__(self):
+        return min(self._written, self.capacity)
+
+    def extend(self, samples):
+        samples = samples[-self.capacity:]
+        n = len(samples)
+        start = self._written % self.capacity
+        first = min(n, self.capacity - start)
+        self._data[start:start + first] = samples[:first]
+        self._data[:n - first] = samples[first:]
+        self._written += n
+
+    def latest(self, n):
+        """Copy of the last n samples in chronological order"""
+        n = min(n, len(self))
+        end = self._written % self.capacity
+        if end >= n:
+            return self._data[end - n:end].copy()
+        return np.concatenate((self._data[self.capacity - (n - end):], self._data[:end]))
+
+class StreamSession:
+    """Per-connection state for a streaming speech session"""
+
+    def __init__(self, sample_rate=16000, window_ms=1000, hop_ms=500, sample_format="pcm16"):
+        if sample_format not in SAMPLE_FORMATS:
+            raise ValueError(f"Unsupported sample format '{sample_format}' (use pcm16 or f32)")
+        if not 8000 <= sample_rate <= 48000:
+            raise ValueError("Sample rate must be between 8000 and 48000 Hz")
+        if not 200 <= window_ms <= 10000:
+            raise ValueError("Window must be between 200 and 10000 ms")
+        if not 0 < hop_ms <= window_ms:
+            raise ValueError("Hop must be positive and no longer than the window")
+
+        self.sample_rate = sample_rate
+        self.dtype, self.scale = SAMPLE_FORMATS[sample_format]
+        self.window = int(sample_rate * window_ms / 1000)
+        self.hop = max(1, int(sample_rate * hop_ms / 1000))
+        self.buffer = RingBuffer(self.window)
+        self.total = 0
+        self._next_emit = self.window
+        self._leftover = b""
+
+    def push(self, payload):
+        """Add raw PCM bytes; return (start_sample, window) pairs that became ready"""
+        payload = self._leftover + payload
+        usable = len(payload) - len(payload) % self.dtype.itemsize
+        self._leftover = payload[usable:]
+
+        samples = np.frombuffer(payload[:usable], dtype=self.dtype).astype(np.float32)
+        if self.scale != 1.0:
+            samples *= self.scale
+
+        windows = []
+        offset = 0
+        while offset < len(samples):
+            # Write up to the next hop boundary so every boundary gets its window
+            take = min(len(samples) - offset, self._next_emit - self.total)
+            self.buffer.extend(samples[offset:offset + take])
+            self.total += take
+            offset += take
+
+            if self.total == self._next_emit:
+                windows.append((self.total - self.window, self.buffer.latest(self.window)))
+                self._next_emit += self.hop
+
+        return windows
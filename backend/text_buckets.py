@@ -0,0 +1,122 @@
+"""
+Length-bucketed text classification
+Tokenizes once, sorts inputs by token length and pads only within each bucket; texts longer than
+the model's window are split into overlapping chunks whose scores are averaged back together
+"""
+
+import os
+import numpy as np
+
+from metrics import STAGE_SECONDS, BATCH_SIZE
+
+# Padded tokens (batch size x longest member) allowed in one forward pass
+TEXT_MAX_BATCH_TOKENS = int(os.getenv("TEXT_MAX_BATCH_TOKENS", "8192"))
+# Tokens shared by consecutive chunks of an over-length text
+TEXT_CHUNK_STRIDE = int(os.getenv("TEXT_CHUNK_STRIDE", "128"))
+
+def supports_bucketing(classifier):
+    """True for a transformers pipeline exposing its tokenizer and model"""
+    return getattr(classifier, "tokenizer", None) is not None and hasattr(getattr(classifier, "model", None), "config")
+
+def split_windows(ids, window, stride):
+    """Overlapping slices of ids, each at most window long, together covering all of ids"""
+    if len(ids) <= window:
+        return [ids]
+    stride = min(stride, window // 2)
+    return [ids[start:start + window] for start in range(0, len(ids) - stride, window - stride)]
+
+def plan_buckets(lengths, max_batch_tokens, max_batch_size=None):
+    """Group indices (sorted by length) so each padded batch stays within the token budget"""
+    order = np.argsort(lengths, kind="stable")
+    buckets = []
+    bucket = []
+    for index in order:
+        # Sorted ascending, so the newest member is the longest
+        size = len(bucket) + 1
+        full = max_batch_size is not None and size > max_batch_size
+        if bucket and (full or size * lengths[index] > max_batch_tokens):
+            buckets.append(bucket)
+            bucket = []
+        bucket.append(int(index))
+    if bucket:
+        buckets.append(bucket)
+    return buckets
+
+def _special_tokens(tokenizer):
+    """(prefix, suffix) token ids the tokenizer wraps around a single sequence"""
+    content = tokenizer("a", add_special_tokens=False)["input_ids"]
+    full = tokenizer("a")["input_ids"]
+    for start in range(len(full) - len(content) + 1):
+        if full[start:start + len(content)] == content:
+            return full[:start], full[start + len(content):]
+    return [], []
+
+def _activation(config):
+    """Score function the text-classification pipeline would use for this model"""
+    if config.problem_type == "multi_label_classification" or config.num_labels == 1:
+        return lambda logits: 1.0 / (1.0 + np.exp(-logits))
+
+    def softmax(logits):
+        shifted = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        return shifted / shifted.sum(axis=-1, keepdims=True)
+    return softmax
+
+def classify(classifier, texts, max_batch_tokens=TEXT_MAX_BATCH_TOKENS, stride=TEXT_CHUNK_STRIDE):
+    """Label scores for each text as ((n, labels) array, label names in column order)"""
+    import torch
+
+    tokenizer, model = classifier.tokenizer, classifier.model
+    config = model.config
+    max_length = tokenizer.model_max_length
+    # Tokenizers without a configured limit report a huge sentinel value
+    if max_length > 100_000:
+        max_length = 512
+
+    with STAGE_SECONDS.time(modality="text", stage="tokenize"):
+        encoded = tokenizer(list(texts), truncation=False, verbose=False)["input_ids"]
+        prefix, suffix = _special_tokens(tokenizer)
+        window = max_length - len(prefix) - len(suffix)
+
+        # One entry per forward-pass sequence: (text index, token ids)
+        chunks = []
+        for text_index, ids in enumerate(encoded):
+            if len(ids) <= max_length:
+                chunks.append((text_index, ids))
+                continue
+            content = ids[len(prefix):len(ids) - len(suffix)]
+            chunks.extend(
+                (text_index, prefix + part + suffix) for part in split_windows(content, window, stride)
+            )
+    lengths = np.array([len(ids) for _, ids in chunks])
+
+    scores = np.zeros((len(chunks), config.num_labels), dtype=np.float32)
+    activation = _activation(config)
+    device = getattr(model, "device", None)
+    pad_id = tokenizer.pad_token_id or 0
+
+    for bucket in plan_buckets(lengths, max_batch_tokens):
+        longest = int(lengths[bucket].max())
+        input_ids = np.full((len(bucket), longest), pad_id, dtype=np.int64)
+        attention_mask = np.zeros((len(bucket), longest), dtype=np.int64)
+        for row, index in enumerate(bucket):
+            ids = chunks[index][1]
+            input_ids[row, :len(ids)] = ids
+            attention_mask[row, :len(ids)] = 1
+
+        BATCH_SIZE.observe(len(bucket), modality="text")
+        with STAGE_SECONDS.time(modality="text", stage="forward"), torch.inference_mode():
+            inputs = {"input_ids": torch.from_numpy(input_ids), "attention_mask": torch.from_numpy(attention_mask)}
+            if device is not None:
+                inputs = {name: tensor.to(device) for name, tensor in inputs.items()}
+            logits = model(**inputs).logits
+        scores[bucket] = activation(logits.float().cpu().numpy())
+
+    # Average chunk scores per text, weighted by how many tokens each chunk covers
+    weights = lengths.astype(np.float32)
+    owners = np.array([text_index for text_index, _ in chunks])
+    totals = np.zeros((len(encoded), config.num_labels), dtype=np.float32)
+    np.add.at(totals, owners, scores * weights[:, None])
+    totals /= np.bincount(owners, weights=weights, minlength=len(encoded))[:, None]
+
+    labels = [config.id2label[i] for i in range(config.num_labels)]
+    return totals, labels
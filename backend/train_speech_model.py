@@ -1,20 +1,23 @@
 import os
-import librosa
+import math
 import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
 from tensorflow.keras.utils import to_categorical
 from models.speech_model import SpeechEmotionModel
+from feature_store import FeatureStore
+from feature_dataset import write_dataset, FeatureDataset
 
 # Configuration
 DATASET_PATH = "datasets" # User should place RAVDESS/TESS here
 MODEL_SAVE_PATH = "model_weights.h5"
+FEATURE_STORE_PATH = "feature_store" # Cached per-file MFCC features
+FEATURE_WORKERS = None # Defaults to one process per CPU
+FEATURE_DATASET_PATH = "feature_dataset" # Memory-mapped training matrix + index
+BATCH_SIZE = 32
 
-def load_data(dataset_path):
-    features = []
-    labels = []
-    
+def find_labelled_files(dataset_path):
+    """Return (file_path, emotion) pairs for every labelled RAVDESS file"""
     print(f"Scanning {dataset_path} for audio files...")
     
     # Example logic for RAVDESS (Actor_01/03-01-01-01-01-01-01.wav)
@@ -26,53 +29,59 @@ def load_data(dataset_path):
         '05': 'angry', '06': 'fearful', '07': 'disgust', '08': 'surprised'
     }
 
+    labelled_files = []
     for root, dirs, files in os.walk(dataset_path):
         for file in files:
             if file.endswith(".wav"):
-                file_path = os.path.join(root, file)
-                
                 # Simple parsing logic for RAVDESS
                 parts = file.split("-")
                 if len(parts) == 7:
-                    emotion_code = parts[2]
-                    emotion = emotion_map.get(emotion_code)
+                    emotion = emotion_map.get(parts[2])
                     if emotion:
-                        # Extract features
-                        try:
-                            audio, sr = librosa.load(file_path, res_type='kaiser_fast')
-                            mfccs = librosa.feature.mfcc(y=audio, sr=sr, n_mfcc=40)
-                            mfccs_processed = np.mean(mfccs.T, axis=0)
-                            
-                            features.append(mfccs_processed)
-                            labels.append(emotion)
-                        except Exception as e:
-                            print(f"Error processing {file}: {e}")
+                        labelled_files.append((os.path.join(root, file), emotion))
+
+    # os.walk order varies between filesystems; a stable order keeps the train/test split reproducible
+    return sorted(labelled_files)
+
+def build_dataset(dataset_path):
+    """Extract features and write them to an on-disk memory-mapped dataset"""
+    labelled_files = find_labelled_files(dataset_path)
+    emotions = dict(labelled_files)
+
+    # Extract features in parallel; unchanged files come from the feature store
+    store = FeatureStore(FEATURE_STORE_PATH)
+    extracted = store.iter_extract([path for path, _ in labelled_files], workers=FEATURE_WORKERS)
+    write_dataset(FEATURE_DATASET_PATH, ((features, emotions[path]) for path, features in extracted))
 
-    return np.array(features), np.array(labels)
+    return FeatureDataset(FEATURE_DATASET_PATH)
+
+def batch_generator(dataset, indices, num_classes, shuffle=False):
+    """Endless (X, y) batches streamed from the memory-mapped dataset"""
+    epoch = 0
+    while True:
+        for X, y in dataset.batches(indices, BATCH_SIZE, shuffle=shuffle, seed=epoch):
+            # Reshape pooled features for CNN (Batch, Steps, Channels)
+            if dataset.fixed_length:
+                X = np.expand_dims(X, axis=2)
+            yield X, to_categorical(y, num_classes)
+        epoch += 1
 
 def train():
     if not os.path.exists(DATASET_PATH):
         print(f"Dataset directory '{DATASET_PATH}' not found. Please create it and add RAVDESS/TESS datasets.")
         return
 
-    X, y = load_data(DATASET_PATH)
+    dataset = build_dataset(DATASET_PATH)
     
-    if len(X) == 0:
+    if len(dataset) == 0:
         print("No data found.")
         return
 
-    print(f"Data loaded: {len(X)} samples")
+    print(f"Data loaded: {len(dataset)} samples")
 
-    # Encode labels
-    lb = LabelEncoder()
-    y = to_categorical(lb.fit_transform(y))
-    
-    # Split data
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    
-    # Reshape for CNN (Batch, Steps, Channels)
-    X_train = np.expand_dims(X_train, axis=2)
-    X_test = np.expand_dims(X_test, axis=2)
+    # Labels are stored encoded; split sample indices rather than arrays
+    num_classes = len(dataset.label_names)
+    train_idx, test_idx = train_test_split(np.arange(len(dataset)), test_size=0.2, random_state=42)
     
     # Initialize model
     speech_model = SpeechEmotionModel(model_path=None) # Don't load existing weights
@@ -80,7 +89,13 @@ def train():
     
     # Train
     print("Starting training...")
-    model.fit(X_train, y_train, batch_size=32, epochs=50, validation_data=(X_test, y_test))
+    model.fit(
+        batch_generator(dataset, train_idx, num_classes, shuffle=True),
+        steps_per_epoch=math.ceil(len(train_idx) / BATCH_SIZE),
+        epochs=50,
+        validation_data=batch_generator(dataset, test_idx, num_classes),
+        validation_steps=math.ceil(len(test_idx) / BATCH_SIZE),
+    )
     
     # Save
     model.save_weights(MODEL_SAVE_PATH)
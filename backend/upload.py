@@ -0,0 +1,247 @@
+"""
+Streaming WAV upload handling
+Parses the multipart body as it arrives, validates the RIFF/WAVE header from the first bytes
+and enforces the byte cap while streaming, so bad uploads are rejected before they are buffered
+"""
+
+import asyncio
+import os
+import struct
+from collections import namedtuple
+from tempfile import SpooledTemporaryFile
+
+from metrics import STAGE_SECONDS
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # Older python-multipart releases
+    from multipart.multipart import MultipartParser, parse_options_header
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+MAX_AUDIO_SECONDS = float(os.getenv("MAX_AUDIO_SECONDS", "1800"))
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(16 * 1024 * 1024)))
+
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 48000
+MAX_CHANNELS = 2
+# Headers with large metadata chunks (LIST, bext...) still fit comfortably
+MAX_HEADER_BYTES = 64 * 1024
+# Multipart framing and small form fields on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 128 * 1024
+# Non-file form fields (e.g. a transcript) are kept in memory up to this size
+MAX_FIELD_BYTES = 64 * 1024
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+SUPPORTED_FORMATS = (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT, WAVE_FORMAT_EXTENSIBLE)
+
+WavInfo = namedtuple("WavInfo", "format_code channels sample_rate bits_per_sample data_bytes duration")
+WavUpload = namedtuple("WavUpload", "file filename content_type size info fields")
+
+class UploadRejected(ValueError):
+    """The upload is not an acceptable WAV file"""
+
+def parse_wav_header(data):
+    """Parse a RIFF/WAVE header from the leading bytes of a file
+
+    Returns WavInfo once the 'data' chunk is reached, or None if more bytes are needed.
+    Raises UploadRejected for anything that is not a WAV file.
+    """
+    if len(data) < 12:
+        return None
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise UploadRejected("Not a WAV file (missing RIFF/WAVE header)")
+
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id = data[offset:offset + 4]
+        chunk_size = struct.unpack_from("<I", data, offset + 4)[0]
+        body = offset + 8
+
+        if chunk_id == b"fmt ":
+            if chunk_size < 16:
+                raise UploadRejected("Malformed WAV header (fmt chunk too short)")
+            if body + 16 > len(data):
+                return None
+            fmt = struct.unpack_from("<HHIIHH", data, body)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise UploadRejected("Malformed WAV header (data before fmt chunk)")
+            format_code, channels, sample_rate, _, block_align, bits = fmt
+            # Streaming writers leave the size as 0 or 0xFFFFFFFF; the byte cap covers those
+            known_size = chunk_size not in (0, 0xFFFFFFFF) and block_align
+            duration = chunk_size / block_align / sample_rate if known_size and sample_rate else None
+            return WavInfo(format_code, channels, sample_rate, bits, chunk_size, duration)
+
+        # Chunks are word-aligned
+        offset = body + chunk_size + (chunk_size & 1)
+
+    return None
+
+def validate_wav_info(info, max_seconds=MAX_AUDIO_SECONDS):
+    """Reject formats the speech pipeline can't use"""
+    if info.format_code not in SUPPORTED_FORMATS:
+        raise UploadRejected(f"Unsupported WAV encoding (format {info.format_code:#06x}); use PCM or float WAV")
+    if not 1 <= info.channels <= MAX_CHANNELS:
+        raise UploadRejected(f"Unsupported channel count {info.channels} (mono or stereo only)")
+    if not MIN_SAMPLE_RATE <= info.sample_rate <= MAX_SAMPLE_RATE:
+        raise UploadRejected(
+            f"Unsupported sample rate {info.sample_rate} Hz ({MIN_SAMPLE_RATE}-{MAX_SAMPLE_RATE} Hz)"
+        )
+    if info.duration is not None and info.duration > max_seconds:
+        raise UploadRejected(f"Audio too long ({info.duration:.0f}s, max {max_seconds:.0f}s)")
+
+class _WavUploadParser:
+    """Multipart callbacks that spool the 'file' field and check it as bytes arrive
+
+    Other form fields are collected as (small) strings.
+    """
+
+    def __init__(self, field_name, max_bytes):
+        self.field_name = field_name
+        self.max_bytes = max_bytes
+        self.file = None
+        self.filename = None
+        self.content_type = None
+        self.size = 0
+        self.info = None
+        self._head = b""
+        self._in_file = False
+        # File bytes parsed but not yet written; receive_wav_upload writes them out
+        self.pending = []
+        self.fields = {}
+        self._field = None
+        self._field_value = b""
+        self._headers = {}
+        self._header_field = b""
+        self._header_value = b""
+
+    def callbacks(self):
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self._headers = {}
+
+    def on_header_field(self, data, start, end):
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("latin-1")
+        if name != self.field_name:
+            if b"filename" not in options:
+                self._field = name
+            return
+        if self.file is not None:
+            return
+
+        filename = options.get(b"filename", b"").decode("utf-8", "replace")
+        # Validate file type
+        if not filename.endswith(".wav"):
+            raise UploadRejected("Only .wav files are supported. Please convert your audio to WAV format.")
+
+        self.filename = filename
+        self.content_type = self._headers.get(b"content-type", b"").decode("latin-1")
+        self.file = SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+        self._in_file = True
+
+    def on_part_data(self, data, start, end):
+        if self._field is not None:
+            self._field_value += data[start:end]
+            if len(self._field_value) > MAX_FIELD_BYTES:
+                raise UploadRejected(f"Form field '{self._field}' too large (max {MAX_FIELD_BYTES // 1024}KB)")
+            return
+        if not self._in_file:
+            return
+
+        chunk = data[start:end]
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadRejected(f"File too large (max {self.max_bytes // (1024 * 1024)}MB)")
+
+        # Check the header as soon as it has arrived
+        if self.info is None:
+            self._head += chunk
+            info = parse_wav_header(self._head)
+            if info is not None:
+                validate_wav_info(info)
+                self.info = info
+                self._head = b""
+            elif len(self._head) > MAX_HEADER_BYTES:
+                raise UploadRejected("Malformed WAV header (no data chunk found)")
+
+        self.pending.append(chunk)
+
+    async def flush(self):
+        """Write pending file bytes, off the event loop once the spool is on disk"""
+        if not self.pending:
+            return
+        data = b"".join(self.pending)
+        self.pending = []
+        # Rolling over to disk (or writing once rolled over) is blocking file I/O
+        if getattr(self.file, "_rolled", True) or self.file.tell() + len(data) > UPLOAD_SPOOL_BYTES:
+            await asyncio.get_running_loop().run_in_executor(None, self.file.write, data)
+        else:
+            self.file.write(data)
+
+    def on_part_end(self):
+        if self._field is not None:
+            self.fields[self._field] = self._field_value.decode("utf-8", "replace")
+            self._field = None
+            self._field_value = b""
+        self._in_file = False
+
+async def receive_wav_upload(request, field_name="file", max_bytes=MAX_UPLOAD_BYTES):
+    """Stream a multipart WAV upload from the request body, rejecting it as early as possible"""
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise UploadRejected("Expected a multipart/form-data upload with a 'file' field")
+
+    # Refuse oversized bodies before reading anything when the client declares the length
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD_BYTES:
+        raise UploadRejected(f"File too large (max {max_bytes // (1024 * 1024)}MB)")
+
+    upload = _WavUploadParser(field_name, max_bytes)
+    parser = MultipartParser(options[b"boundary"], upload.callbacks())
+    try:
+        with STAGE_SECONDS.time(modality="audio", stage="upload"):
+            async for chunk in request.stream():
+                parser.write(chunk)
+                await upload.flush()
+            parser.finalize()
+            await upload.flush()
+    except Exception:
+        if upload.file is not None:
+            upload.file.close()
+        raise
+
+    if upload.file is None:
+        raise UploadRejected("No audio file uploaded")
+    if upload.size == 0:
+        upload.file.close()
+        raise UploadRejected("Uploaded file is empty")
+    if upload.info is None:
+        upload.file.close()
+        raise UploadRejected("Not a valid WAV file (incomplete header)")
+
+    upload.file.seek(0)
+    return WavUpload(upload.file, upload.filename, upload.content_type, upload.size, upload.info, upload.fields)
@@ -0,0 +1,75 @@
+"""
+Voice activity detection
+Energy + spectral-shape VAD used to drop silence, hold tones and steady noise before speech inference
+"""
+
+import os
+import numpy as np
+from scipy import fft
+
+# 0 disables trimming; 1-3 trade recall for more aggressive removal (like WebRTC VAD modes)
+VAD_AGGRESSIVENESS = int(os.getenv("VAD_AGGRESSIVENESS", "1"))
+
+FRAME_SECONDS = 0.03
+HANGOVER_SECONDS = 0.2
+
+# aggressiveness -> (dB above noise floor, absolute floor dBFS, max spectral flatness, max tonal peak ratio)
+VAD_MODES = {
+    1: (6.0, -55.0, 0.6, 0.7),
+    2: (10.0, -50.0, 0.5, 0.6),
+    3: (15.0, -45.0, 0.4, 0.5),
+}
+
+def _frames(audio, sr):
+    frame = max(1, int(FRAME_SECONDS * sr))
+    count = len(audio) // frame
+    return audio[:count * frame].reshape(count, frame), frame
+
+def speech_mask(audio, sr, aggressiveness=VAD_AGGRESSIVENESS):
+    """Boolean speech/non-speech decision per FRAME_SECONDS frame"""
+    frames, _ = _frames(audio, sr)
+    if len(frames) == 0:
+        return np.zeros(0, dtype=bool)
+    if aggressiveness <= 0:
+        return np.ones(len(frames), dtype=bool)
+
+    margin_db, floor_db, max_flatness, max_peak_ratio = VAD_MODES[min(aggressiveness, 3)]
+
+    # Energy relative to both the clip's own noise floor and an absolute floor
+    power = np.mean(np.square(frames), axis=1, dtype=np.float32)
+    energy_db = 10.0 * np.log10(np.maximum(power, 1e-10))
+    noise_floor = np.percentile(energy_db, 10)
+    mask = energy_db > max(noise_floor + margin_db, floor_db)
+
+    # Spectral shape: broadband noise is flat, hold tones put nearly all power in one bin
+    spectrum = np.square(np.abs(fft.rfft(frames, axis=1))) + 1e-12
+    flatness = np.exp(np.mean(np.log(spectrum), axis=1)) / np.mean(spectrum, axis=1)
+    peak_ratio = spectrum.max(axis=1) / spectrum.sum(axis=1)
+    mask &= (flatness < max_flatness) & (peak_ratio < max_peak_ratio)
+
+    # Hangover: keep a little context around speech so word edges aren't clipped
+    pad = int(HANGOVER_SECONDS / FRAME_SECONDS)
+    if pad and mask.any():
+        mask = np.convolve(mask, np.ones(2 * pad + 1), mode="same") > 0
+
+    return mask
+
+def trim_silence(audio, sr, aggressiveness=VAD_AGGRESSIVENESS):
+    """Keep only speech frames; returns (audio, trimmed_ratio)
+
+    Audio with no detected speech is returned untouched so the model still sees it.
+    """
+    if aggressiveness <= 0 or len(audio) == 0:
+        return audio, 0.0
+
+    mask = speech_mask(audio, sr, aggressiveness)
+    if not mask.any() or mask.all():
+        return audio, 0.0
+
+    frames, frame = _frames(audio, sr)
+    kept = frames[mask].reshape(-1)
+    # The partial frame at the end follows the last frame's decision
+    if mask[-1]:
+        kept = np.concatenate((kept, audio[len(frames) * frame:]))
+
+    return kept, 1.0 - len(kept) / len(audio)
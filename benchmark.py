@@ -0,0 +1,275 @@
+"""
+Backend Latency/Throughput Benchmark
+Drives /predict/text and /predict/audio at a configurable concurrency and reports
+p50/p95/p99 latency, requests/sec and peak RSS as JSON
+
+In-process (ASGI app with stub models, no model downloads):
+    python benchmark.py --workload text --requests 500 --concurrency 32
+Against a running server:
+    python benchmark.py --url http://localhost:8000 --workload audio --audio-dir clips/
+Regression check against a previous run:
+    python benchmark.py --output new.json --compare baseline.json --tolerance 0.15
+
+Needs httpx besides the backend requirements: pip install -r requirements-bench.txt
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import re
+import resource
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+import soundfile as sf
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+SAMPLE_TEXTS = [
+    "I'm so happy and excited about this!",
+    "This makes me feel terrible",
+    "I'm furious about this!",
+    "I'm terrified of what might happen",
+    "Wow, I didn't expect that!",
+    "The meeting is at 3pm",
+    "That's absolutely disgusting",
+    "Thanks so much for your help, I really appreciate it.",
+]
+
+# --- Stub models for in-process runs ---
+
+class StubTextClassifier:
+    """Mimics the go_emotions pipeline with a fixed per-batch and per-item cost"""
+
+    def __init__(self, batch_ms, item_ms):
+        self.batch_ms = batch_ms
+        self.item_ms = item_ms
+
+    def __call__(self, texts, **kwargs):
+        time.sleep((self.batch_ms + self.item_ms * len(texts)) / 1000.0)
+        return [
+            [{"label": "joy", "score": 0.7}, {"label": "neutral", "score": 0.2}, {"label": "anger", "score": 0.1}]
+            for _ in texts
+        ]
+
+class StubTextModel:
+    def __init__(self, batch_ms, item_ms):
+        self.classifier = StubTextClassifier(batch_ms, item_ms)
+
+class StubSpeechModel:
+    """Decodes the upload and sleeps in proportion to its duration"""
+
+    model = "stub"
+
+    def __init__(self, ms_per_second):
+        self.ms_per_second = ms_per_second
+
+    def predict_array(self, audio, sr):
+        time.sleep(len(audio) / sr * self.ms_per_second / 1000.0)
+        return {"emotion": "Neutral", "confidence": 0.6, "all_scores": {"Neutral": 0.6, "Happiness": 0.4}}
+
+    def predict(self, fileobj):
+        audio, sr = sf.read(fileobj, dtype="float32")
+        return self.predict_array(audio, sr)
+
+# --- Workloads ---
+
+def synthetic_wav(seconds, sr=16000, seed=0):
+    """A short tone-plus-noise WAV clip"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    audio = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.05 * rng.standard_normal(len(t))
+    buffer = io.BytesIO()
+    sf.write(buffer, audio.astype(np.float32), sr, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+# Sentence boundaries as the backend splits them (see backend/sentences.py)
+SENTENCE_START = re.compile(r"(?<=[.!?…])\s+|\s*\n+\s*")
+
+def tag_sentences(text, tag):
+    """text with tag at the start of every sentence, so no sentence is a cache hit"""
+    return f"{tag} " + SENTENCE_START.sub(lambda m: f"{m.group(0)}{tag} ", text)
+
+def build_workload(args):
+    """List of (kind, payload) requests"""
+    rng = random.Random(args.seed)
+    if args.workload == "text":
+        texts = SAMPLE_TEXTS
+        if args.texts_file:
+            with open(args.texts_file, encoding="utf-8") as f:
+                texts = [line.strip() for line in f if line.strip()]
+        # Tag every sentence with a counter unless repeats are wanted, so neither the result
+        # cache nor the sentence cache skews the run
+        return [("text", rng.choice(texts) if args.repeat else tag_sentences(rng.choice(texts), f"#{i}"))
+                for i in range(args.requests)]
+
+    if args.audio_dir:
+        clips = []
+        for name in sorted(os.listdir(args.audio_dir)):
+            if name.endswith(".wav"):
+                with open(os.path.join(args.audio_dir, name), "rb") as f:
+                    clips.append(f.read())
+        if not clips:
+            raise SystemExit(f"No .wav files found in {args.audio_dir}")
+        return [("audio", rng.choice(clips)) for _ in range(args.requests)]
+
+    if args.repeat:
+        clips = [synthetic_wav(args.audio_seconds, seed=i) for i in range(8)]
+        return [("audio", rng.choice(clips)) for _ in range(args.requests)]
+    # Distinct bytes per request so uploads miss the result cache
+    return [("audio", synthetic_wav(args.audio_seconds, seed=i)) for i in range(args.requests)]
+
+async def send(client, kind, payload):
+    if kind == "text":
+        return await client.post("/predict/text", json={"text": payload})
+    return await client.post("/predict/audio", files={"file": ("bench.wav", payload, "audio/wav")})
+
+async def run_load(client, workload, concurrency):
+    """Replay the workload with a fixed number of concurrent clients"""
+    latencies = []
+    statuses = {}
+    queue = list(reversed(workload))
+
+    async def worker():
+        while queue:
+            kind, payload = queue.pop()
+            start = time.perf_counter()
+            try:
+                response = await send(client, kind, payload)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return latencies, statuses, time.perf_counter() - start
+
+# --- Reporting ---
+
+def peak_rss_mb(pid=None):
+    """Peak resident memory of this process, or of pid when given (Linux only)"""
+    if pid:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+def summarize(latencies, statuses, elapsed):
+    ms = np.array(latencies) * 1000
+    ok = statuses.get(200, 0)
+    return {
+        "requests": len(latencies),
+        "ok": ok,
+        "statuses": {str(k): v for k, v in statuses.items()},
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "p50": round(float(np.percentile(ms, 50)), 2),
+            "p95": round(float(np.percentile(ms, 95)), 2),
+            "p99": round(float(np.percentile(ms, 99)), 2),
+            "mean": round(float(ms.mean()), 2),
+            "max": round(float(ms.max()), 2),
+        },
+    }
+
+def compare(result, baseline_path, tolerance):
+    """Return regressions (p95 latency up or throughput down by more than tolerance)"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    regressions = []
+    old_p95, new_p95 = baseline["latency_ms"]["p95"], result["latency_ms"]["p95"]
+    if new_p95 > old_p95 * (1 + tolerance):
+        regressions.append(f"p95 latency {old_p95:.1f} ms -> {new_p95:.1f} ms")
+    old_rps, new_rps = baseline["requests_per_s"], result["requests_per_s"]
+    if old_rps and new_rps < old_rps * (1 - tolerance):
+        regressions.append(f"throughput {old_rps:.1f} -> {new_rps:.1f} req/s")
+    return regressions
+
+async def main_async(args):
+    workload = build_workload(args)
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+    else:
+        # In-process: stub models behind the real app, routing, batching and executors
+        os.environ.setdefault("MODEL_LOADING", "lazy")
+        from model_loader import text_loader, speech_loader
+        text_loader.set_model(StubTextModel(args.stub_batch_ms, args.stub_item_ms))
+        speech_loader.set_model(StubSpeechModel(args.stub_audio_ms))
+        import main as backend_main
+
+        transport = httpx.ASGITransport(app=backend_main.app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=args.timeout)
+
+    async with client:
+        # Warm up connections, lazy model loads and the batcher
+        await run_load(client, workload[:args.concurrency], args.concurrency)
+        latencies, statuses, elapsed = await run_load(client, workload, args.concurrency)
+
+    result = {
+        "commit": git_commit(),
+        "target": args.url or "asgi-stub",
+        "workload": args.workload,
+        "concurrency": args.concurrency,
+        **summarize(latencies, statuses, elapsed),
+        "peak_rss_mb": peak_rss_mb(args.server_pid if args.url else None),
+    }
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the emotion recognition API")
+    parser.add_argument("--url", help="Base URL of a running server (default: in-process ASGI with stub models)")
+    parser.add_argument("--workload", choices=["text", "audio"], default="text")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--texts-file", help="Text file with one sample per line")
+    parser.add_argument("--audio-dir", help="Directory of recorded .wav clips")
+    parser.add_argument("--audio-seconds", type=float, default=3.0, help="Length of synthetic clips")
+    parser.add_argument("--repeat", action="store_true", help="Reuse a small pool of inputs (exercises the result cache)")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--server-pid", type=int, help="Report peak RSS of this server process")
+    parser.add_argument("--stub-batch-ms", type=float, default=20.0, help="Stub text cost per batch")
+    parser.add_argument("--stub-item-ms", type=float, default=2.0, help="Stub text cost per item")
+    parser.add_argument("--stub-audio-ms", type=float, default=50.0, help="Stub speech cost per second of audio")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--compare", help="Baseline JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    result = asyncio.run(main_async(args))
+    print(json.dumps(result, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"✓ Saved results to {args.output}")
+
+    if args.compare:
+        regressions = compare(result, args.compare, args.tolerance)
+        for regression in regressions:
+            print(f"✗ Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+        print("✓ No regressions against baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Backend API client
+One keep-alive connection pool per process with timeouts and retries, shared by the Streamlit
+frontend and the evaluation script; map() fans independent requests out over the pool
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Backend base URL
+API_URL = os.getenv("API_URL", "http://localhost:8000").rstrip("/")
+# Seconds to open a connection and to wait for a response
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "5"))
+API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "120"))
+# Retries on connection errors and 502/503/504 (cold starts, full queues), with exponential backoff
+API_RETRIES = int(os.getenv("API_RETRIES", "4"))
+API_RETRY_BACKOFF = float(os.getenv("API_RETRY_BACKOFF", "1.0"))
+# Pooled connections kept open, and requests map() runs at once
+API_CONCURRENCY = int(os.getenv("API_CONCURRENCY", "8"))
+
+class ApiClient:
+    """Thin wrapper over a pooled requests.Session; methods return the raw Response"""
+
+    def __init__(self, base_url=API_URL, connect_timeout=API_CONNECT_TIMEOUT, read_timeout=API_READ_TIMEOUT,
+                 retries=API_RETRIES, backoff=API_RETRY_BACKOFF, concurrency=API_CONCURRENCY):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.concurrency = max(1, concurrency)
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            # A read timeout means the model is still working; resending would only queue it twice
+            read=0,
+            status=retries,
+            status_forcelist=(502, 503, 504),
+            # Predictions have no side effects, so POSTs are safe to resend
+            allowed_methods=None,
+            backoff_factor=backoff,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _request(self, method, path, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, f"{self.base_url}{path}", **kwargs)
+
+    def health(self, timeout=None):
+        return self._request("GET", "/health", timeout=timeout or self.timeout)
+
+    def predict_text(self, text):
+        return self._request("POST", "/predict/text", json={"text": text})
+
+    def predict_text_batch(self, texts):
+        return self._request("POST", "/predict/text/batch", json={"texts": list(texts)})
+
+    def predict_audio(self, audio, filename="audio.wav", vad_aggressiveness=None):
+        """POST WAV bytes or a file object to /predict/audio"""
+        params = {} if vad_aggressiveness is None else {"vad_aggressiveness": vad_aggressiveness}
+        files = {"file": (filename, audio, "audio/wav")}
+        return self._request("POST", "/predict/audio", files=files, params=params)
+
+    def predict_multimodal(self, text, audio, filename="audio.wav", text_weight=None):
+        params = {} if text_weight is None else {"text_weight": text_weight}
+        files = {"file": (filename, audio, "audio/wav")}
+        return self._request("POST", "/predict/multimodal", data={"text": text}, files=files, params=params)
+
+    def map(self, fn, items, concurrency=None):
+        """fn(item) for every item, run concurrently over the pool; results keep input order
+
+        Exceptions are returned in place of the result so one failure doesn't discard the rest.
+        """
+        def call(item):
+            try:
+                return fn(item)
+            except Exception as e:
+                return e
+
+        items = list(items)
+        workers = min(concurrency or self.concurrency, len(items)) or 1
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(call, items))
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,12 +1,10 @@
 import streamlit as st
-import requests
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from st_audiorec import st_audiorec
 
-# Configuration
-API_URL = "http://localhost:8000"
+from api_client import ApiClient
 
 st.set_page_config(
     page_title="Emotion AI - Professional Analytics",
@@ -15,6 +13,13 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+@st.cache_resource
+def get_client():
+    """One pooled client per server process, reused across reruns and sessions"""
+    return ApiClient()
+
+client = get_client()
+
 # --- Premium Professional CSS ---
 st.markdown("""
     <style>
@@ -309,7 +314,7 @@ with tab1:
     if analyze_text and text_input:
         with st.spinner("🧠 Analyzing..."):
             try:
-                response = requests.post(f"{API_URL}/predict/text", json={"text": text_input})
+                response = client.predict_text(text_input)
                 if response.status_code == 200:
                     data = response.json()["data"]
                     label = data["label"]
@@ -371,8 +376,7 @@ with tab2:
         if st.button("🌊 Analyze Uploaded Audio", key="btn_upload", use_container_width=True):
             with st.spinner("🎧 Processing audio..."):
                 try:
-                    files = {"file": (audio_file.name, audio_file, "audio/wav")}
-                    response = requests.post(f"{API_URL}/predict/audio", files=files)
+                    response = client.predict_audio(audio_file, audio_file.name)
                     
                     if response.status_code == 200:
                         st.session_state.audio_result = response.json()["data"]
@@ -388,8 +392,7 @@ with tab2:
         if st.button("🌊 Analyze Recorded Audio", key="btn_record", use_container_width=True):
             with st.spinner("🎧 Processing recording..."):
                 try:
-                    files = {"file": ("recording.wav", wav_audio_data, "audio/wav")}
-                    response = requests.post(f"{API_URL}/predict/audio", files=files)
+                    response = client.predict_audio(wav_audio_data, "recording.wav")
                     
                     if response.status_code == 200:
                         st.session_state.audio_result = response.json()["data"]
@@ -404,17 +407,9 @@ with tab2:
         data = st.session_state.audio_result
         emotion = data["emotion"]
         confidence = data["confidence"]
+        # Neutral suppression is applied by the backend (SPEECH_NEUTRAL_SCALE)
         probs = data.get("all_scores", {})
         
-        # More aggressive neutral suppression
-        if "Neutral" in probs and probs["Neutral"] < 0.95:
-            # If neutral confidence is <95%, reduce it by 70% (was 50%)
-            probs["Neutral"] = probs["Neutral"] * 0.3
-            # Recalculate top emotion after suppression
-            if probs:
-                emotion = max(probs, key=probs.get)
-                confidence = probs[emotion]
-        
         st.markdown("---")
         res_col1, res_col2 = st.columns([1, 1])
         
@@ -3,14 +3,21 @@ Emotion Recognition Model Evaluation Script
 Tests model accuracy, precision, recall, and generates confusion matrix
 """
 
-import requests
+import os
+import sys
 import json
 from sklearn.metrics import accuracy_score, precision_recall_fscore_support, confusion_matrix
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-API_URL = "http://localhost:8000"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend"))
+from api_client import ApiClient
+
+client = ApiClient()
+
+# Texts per /predict/text/batch request; the requests are sent concurrently
+EVAL_CHUNK_SIZE = 4
 
 # Test samples with ground truth labels
 TEXT_TEST_DATA = [
@@ -60,30 +67,34 @@ def test_text_model():
     true_labels = []
     predicted_labels = []
     
-    for text, true_emotion in TEXT_TEST_DATA:
-        try:
-            response = requests.post(
-                f"{API_URL}/predict/text",
-                json={"text": text},
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                data = response.json()["data"]
-                predicted = data["label"]
-                confidence = data["score"]
-                
-                true_labels.append(true_emotion)
-                predicted_labels.append(predicted)
-                
-                match = "✓" if predicted == true_emotion else "✗"
-                print(f"{match} Text: '{text[:50]}...'")
-                print(f"  True: {true_emotion} | Predicted: {predicted} ({confidence*100:.1f}%)")
-            else:
-                print(f"✗ Error: {response.status_code}")
-                
-        except Exception as e:
-            print(f"✗ Connection Error: {e}")
+    # Split the samples into small batches scored concurrently over the shared connection pool
+    chunks = [TEXT_TEST_DATA[i:i + EVAL_CHUNK_SIZE] for i in range(0, len(TEXT_TEST_DATA), EVAL_CHUNK_SIZE)]
+    responses = client.map(lambda chunk: client.predict_text_batch([text for text, _ in chunk]), chunks)
+
+    for chunk, response in zip(chunks, responses):
+        if isinstance(response, Exception):
+            print(f"✗ Connection Error: {response}")
+            continue
+        if response.status_code != 200:
+            print(f"✗ Error: {response.status_code}")
+            continue
+
+        items = response.json()["data"]
+        for (text, true_emotion), item in zip(chunk, items):
+            if item["status"] != "success":
+                print(f"✗ Error: {item['detail']}")
+                continue
+
+            data = item["data"]
+            predicted = data["label"]
+            confidence = data["score"]
+
+            true_labels.append(true_emotion)
+            predicted_labels.append(predicted)
+
+            match = "✓" if predicted == true_emotion else "✗"
+            print(f"{match} Text: '{text[:50]}...'")
+            print(f"  True: {true_emotion} | Predicted: {predicted} ({confidence*100:.1f}%)")
     
     # Calculate metrics
     if true_labels and predicted_labels:
@@ -134,7 +145,7 @@ def plot_confusion_matrix(cm, labels, title):
 def test_api_health():
     """Test if API is running"""
     try:
-        response = requests.get(f"{API_URL}/health", timeout=5)
+        response = client.health()
         if response.status_code == 200:
             print("✓ API is running and healthy")
             return True
@@ -143,7 +154,7 @@ def test_api_health():
             return False
     except Exception as e:
         print(f"✗ Cannot connect to API: {e}")
-        print(f"  Make sure backend is running at {API_URL}")
+        print(f"  Make sure backend is running at {client.base_url}")
         return False
 
 def main():
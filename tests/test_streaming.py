@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from streaming import RingBuffer, StreamSession
+
+def pcm16(samples):
+    return np.asarray(samples, dtype="<i2").tobytes()
+
+def test_ring_buffer_keeps_latest_samples_in_order():
+    buffer = RingBuffer(4)
+    buffer.extend(np.arange(3, dtype=np.float32))
+    assert len(buffer) == 3
+    np.testing.assert_array_equal(buffer.latest(3), [0, 1, 2])
+
+    # Wraps around the end of the storage
+    buffer.extend(np.arange(3, 6, dtype=np.float32))
+    assert len(buffer) == 4
+    np.testing.assert_array_equal(buffer.latest(4), [2, 3, 4, 5])
+    np.testing.assert_array_equal(buffer.latest(2), [4, 5])
+
+def test_ring_buffer_extend_longer_than_capacity():
+    buffer = RingBuffer(3)
+    buffer.extend(np.arange(10, dtype=np.float32))
+    np.testing.assert_array_equal(buffer.latest(3), [7, 8, 9])
+
+def test_ring_buffer_latest_is_a_copy():
+    buffer = RingBuffer(3)
+    buffer.extend(np.ones(3, dtype=np.float32))
+    buffer.latest(3)[:] = 0
+    np.testing.assert_array_equal(buffer.latest(3), [1, 1, 1])
+
+def test_session_emits_a_window_per_hop():
+    # 8 kHz, 250 ms window (2000 samples), 125 ms hop (1000 samples)
+    session = StreamSession(8000, 250, 125)
+    assert session.push(pcm16(np.zeros(1999))) == []
+
+    windows = session.push(pcm16(np.zeros(3001)))
+    assert [start for start, _ in windows] == [0, 1000, 2000, 3000]
+    assert all(len(window) == 2000 for _, window in windows)
+
+def test_session_windows_hold_the_right_samples():
+    session = StreamSession(8000, 250, 125)
+    samples = np.arange(4000) % 1000
+    windows = session.push(pcm16(samples))
+    for start, window in windows:
+        np.testing.assert_allclose(window, samples[start:start + 2000] / 32768.0)
+
+def test_session_buffers_partial_samples_across_frames():
+    session = StreamSession(8000, 250, 125)
+    payload = pcm16(np.full(2000, 16384))
+    assert session.push(payload[:1001]) == []
+    (start, window), = session.push(payload[1001:])
+    assert start == 0
+    np.testing.assert_allclose(window, 0.5)
+
+def test_session_f32_format():
+    session = StreamSession(8000, 250, 250, "f32")
+    (_, window), = session.push(np.full(2000, 0.25, dtype="<f4").tobytes())
+    np.testing.assert_allclose(window, 0.25)
+
+@pytest.mark.parametrize("kwargs", [
+    {"sample_format": "mp3"},
+    {"sample_rate": 4000},
+    {"window_ms": 100},
+    {"hop_ms": 0},
+    {"window_ms": 500, "hop_ms": 600},
+])
+def test_session_rejects_bad_parameters(kwargs):
+    with pytest.raises(ValueError):
+        StreamSession(**kwargs)
@@ -0,0 +1,45 @@
+import numpy as np
+
+from text_buckets import plan_buckets, split_windows
+
+def test_split_windows_short_input_is_one_window():
+    ids = list(range(10))
+    assert split_windows(ids, 10, 3) == [ids]
+
+def test_split_windows_cover_everything_with_overlap():
+    ids = list(range(25))
+    windows = split_windows(ids, 10, 3)
+    assert all(len(window) <= 10 for window in windows)
+    assert windows[0][:3] == [0, 1, 2]
+    assert windows[-1][-1] == 24
+    # Consecutive windows share exactly the stride
+    for previous, current in zip(windows, windows[1:]):
+        assert previous[-3:] == current[:3]
+    assert sorted(set(i for window in windows for i in window)) == ids
+
+def test_split_windows_caps_stride_at_half_the_window():
+    windows = split_windows(list(range(20)), 8, 100)
+    # Stride 4: windows start every 4 tokens
+    assert [window[0] for window in windows] == [0, 4, 8, 12]
+
+def test_plan_buckets_covers_every_index_once_sorted_by_length():
+    lengths = np.array([5, 100, 3, 50, 7, 60])
+    buckets = plan_buckets(lengths, max_batch_tokens=120)
+    assert sorted(i for bucket in buckets for i in bucket) == list(range(len(lengths)))
+    ordered = [lengths[i] for bucket in buckets for i in bucket]
+    assert ordered == sorted(ordered)
+
+def test_plan_buckets_respects_the_token_budget():
+    lengths = np.array([10, 10, 10, 40, 40, 90])
+    buckets = plan_buckets(lengths, max_batch_tokens=80)
+    for bucket in buckets:
+        if len(bucket) > 1:
+            assert len(bucket) * lengths[bucket].max() <= 80
+    assert buckets == [[0, 1, 2], [3, 4], [5]]
+
+def test_plan_buckets_oversized_item_gets_its_own_bucket():
+    assert plan_buckets(np.array([500, 4]), max_batch_tokens=100) == [[1], [0]]
+
+def test_plan_buckets_max_batch_size():
+    buckets = plan_buckets(np.ones(5, dtype=int), max_batch_tokens=1000, max_batch_size=2)
+    assert buckets == [[0, 1], [2, 3], [4]]
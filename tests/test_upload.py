@@ -0,0 +1,83 @@
+import struct
+
+import pytest
+
+from upload import (
+    MAX_CHANNELS, WAVE_FORMAT_IEEE_FLOAT, WAVE_FORMAT_PCM, UploadRejected, WavInfo,
+    parse_wav_header, validate_wav_info,
+)
+
+def wav_header(format_code=WAVE_FORMAT_PCM, channels=1, sample_rate=16000, bits=16,
+               data_bytes=32000, extra_chunks=b""):
+    block_align = channels * bits // 8
+    fmt = struct.pack("<HHIIHH", format_code, channels, sample_rate, sample_rate * block_align, block_align, bits)
+    body = b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt + extra_chunks
+    body += b"data" + struct.pack("<I", data_bytes)
+    return b"RIFF" + struct.pack("<I", min(len(body) + data_bytes, 0xFFFFFFFF)) + body
+
+def info(**overrides):
+    values = dict(format_code=WAVE_FORMAT_PCM, channels=1, sample_rate=16000, bits_per_sample=16,
+                  data_bytes=32000, duration=1.0)
+    values.update(overrides)
+    return WavInfo(**values)
+
+def test_parse_pcm_header():
+    parsed = parse_wav_header(wav_header(channels=2, sample_rate=44100, data_bytes=44100 * 4 * 3))
+    assert parsed == WavInfo(WAVE_FORMAT_PCM, 2, 44100, 16, 44100 * 4 * 3, 3.0)
+
+def test_parse_skips_other_chunks_with_padding():
+    # Odd-sized chunks are followed by a pad byte
+    extra = b"LIST" + struct.pack("<I", 5) + b"abcde" + b"\x00"
+    parsed = parse_wav_header(wav_header(extra_chunks=extra))
+    assert parsed.sample_rate == 16000
+    assert parsed.duration == 1.0
+
+def test_parse_needs_more_bytes():
+    header = wav_header()
+    for length in (0, 11, 20, len(header) - 8):
+        assert parse_wav_header(header[:length]) is None
+
+@pytest.mark.parametrize("size", [0, 0xFFFFFFFF])
+def test_parse_streaming_writer_sizes_have_no_duration(size):
+    assert parse_wav_header(wav_header(data_bytes=size)).duration is None
+
+def test_parse_rejects_non_wav():
+    with pytest.raises(UploadRejected, match="RIFF/WAVE"):
+        parse_wav_header(b"ID3\x03" + b"\x00" * 40)
+
+def test_parse_rejects_data_before_fmt():
+    header = b"RIFF" + struct.pack("<I", 100) + b"WAVE" + b"data" + struct.pack("<I", 64)
+    with pytest.raises(UploadRejected, match="data before fmt"):
+        parse_wav_header(header)
+
+def test_parse_rejects_short_fmt_chunk():
+    header = b"RIFF" + struct.pack("<I", 100) + b"WAVE" + b"fmt " + struct.pack("<I", 8) + b"\x00" * 8
+    with pytest.raises(UploadRejected, match="fmt chunk too short"):
+        parse_wav_header(header)
+
+def test_upload_rejected_is_a_value_error():
+    # Endpoints map ValueError to 400
+    assert issubclass(UploadRejected, ValueError)
+
+@pytest.mark.parametrize("overrides", [
+    {},
+    {"format_code": WAVE_FORMAT_IEEE_FLOAT, "bits_per_sample": 32},
+    {"channels": MAX_CHANNELS},
+    {"sample_rate": 8000},
+    {"sample_rate": 48000},
+    {"duration": None},
+])
+def test_validate_accepts(overrides):
+    validate_wav_info(info(**overrides))
+
+@pytest.mark.parametrize("overrides, message", [
+    ({"format_code": 0x0055}, "Unsupported WAV encoding"),
+    ({"channels": 0}, "channel count"),
+    ({"channels": MAX_CHANNELS + 1}, "channel count"),
+    ({"sample_rate": 7999}, "sample rate"),
+    ({"sample_rate": 96000}, "sample rate"),
+    ({"duration": 11.0}, "too long"),
+])
+def test_validate_rejects(overrides, message):
+    with pytest.raises(UploadRejected, match=message):
+        validate_wav_info(info(**overrides), max_seconds=10)